@@ -10,14 +10,123 @@
 # Step 5: Create a delete method that removes the key-value pair from the hash table.
 # Step 6: Create a display method that prints the key-value pairs in the hash table.
 
+## Hash functions:
+# A good hash function spreads the keys evenly over all the buckets.
+# Summing the ASCII codes of the characters is easy to understand but it is a poor hash function:
+# - Anagrams always collide: "John" and "Jhon" have the same sum.
+# - Short keys have small sums, so they all land in a narrow band of buckets.
+# Better choices:
+# 1. Seeded built-in hash: Python's own hash() mixed with a seed, so every table can use a different layout.
+# 2. FNV-1a: for every byte, XOR it into the hash and multiply by a prime. Fast and well distributed, but not keyed.
+# 3. SipHash: a keyed hash function. Without the secret key an attacker cannot craft keys that all collide (hash flooding).
+# Every HashTable below takes a hash_func argument: a function that turns a key into a (large) integer.
+# The table then takes that integer modulo its size to get the bucket index.
+import os
+import time
+from collections import Counter
+from itertools import islice
+
+MASK_64 = 0xFFFFFFFFFFFFFFFF
+FNV_OFFSET_BASIS = 0xCBF29CE484222325
+FNV_PRIME = 0x100000001B3
+
+def key_to_bytes(key):
+    if isinstance(key, bytes):
+        return key
+    if isinstance(key, str):
+        return key.encode("utf-8")
+    return repr(key).encode("utf-8")
+
+def sum_ascii_hash(key):
+    return sum([ord(char) for char in key])
+
+def make_seeded_hash(seed=None):
+    if seed is None:
+        seed = int.from_bytes(os.urandom(8), "little")
+    def seeded_hash(key):
+        return hash((seed, key)) & MASK_64
+    return seeded_hash
+
+def fnv1a_hash(key):
+    hash_value = FNV_OFFSET_BASIS
+    for byte in key_to_bytes(key):
+        hash_value ^= byte
+        hash_value = (hash_value * FNV_PRIME) & MASK_64
+    return hash_value
+
+def _rotl(x, b):
+    return ((x << b) | (x >> (64 - b))) & MASK_64
+
+def _sip_round(v0, v1, v2, v3):
+    v0 = (v0 + v1) & MASK_64
+    v1 = _rotl(v1, 13) ^ v0
+    v0 = _rotl(v0, 32)
+    v2 = (v2 + v3) & MASK_64
+    v3 = _rotl(v3, 16) ^ v2
+    v0 = (v0 + v3) & MASK_64
+    v3 = _rotl(v3, 21) ^ v0
+    v2 = (v2 + v1) & MASK_64
+    v1 = _rotl(v1, 17) ^ v2
+    v2 = _rotl(v2, 32)
+    return v0, v1, v2, v3
+
+def siphash24(data, k0, k1):
+    v0 = k0 ^ 0x736F6D6570736575
+    v1 = k1 ^ 0x646F72616E646F6D
+    v2 = k0 ^ 0x6C7967656E657261
+    v3 = k1 ^ 0x7465646279746573
+    length = len(data)
+    end = length - length % 8
+    # Compression: 2 rounds for every 8-byte block
+    for i in range(0, end, 8):
+        m = int.from_bytes(data[i:i + 8], "little")
+        v3 ^= m
+        v0, v1, v2, v3 = _sip_round(v0, v1, v2, v3)
+        v0, v1, v2, v3 = _sip_round(v0, v1, v2, v3)
+        v0 ^= m
+    # The last block holds the remaining bytes and the message length
+    m = ((length & 0xFF) << 56) | int.from_bytes(data[end:], "little")
+    v3 ^= m
+    v0, v1, v2, v3 = _sip_round(v0, v1, v2, v3)
+    v0, v1, v2, v3 = _sip_round(v0, v1, v2, v3)
+    v0 ^= m
+    # Finalization: 4 rounds
+    v2 ^= 0xFF
+    for _ in range(4):
+        v0, v1, v2, v3 = _sip_round(v0, v1, v2, v3)
+    return v0 ^ v1 ^ v2 ^ v3
+
+def make_siphash(secret=None):
+    if secret is None:
+        secret = os.urandom(16)
+    k0 = int.from_bytes(secret[:8], "little")
+    k1 = int.from_bytes(secret[8:16], "little")
+    def siphash(key):
+        return siphash24(key_to_bytes(key), k0, k1)
+    return siphash
+
+# Batch operations read their input in chunks, so a file or a generator is never loaded into memory all at once
+BATCH_SIZE = 10000
+
+def batches(iterable, batch_size=BATCH_SIZE):
+    iterator = iter(iterable)
+    batch = list(islice(iterator, batch_size))
+    while batch:
+        yield batch
+        batch = list(islice(iterator, batch_size))
+
+# print(sum_ascii_hash("John") == sum_ascii_hash("Jhon")) # Output: True
+# print(fnv1a_hash("John") == fnv1a_hash("Jhon")) # Output: False
+# print(hex(siphash24(bytes(range(15)), 0x0706050403020100, 0x0F0E0D0C0B0A0908))) # Output: 0xa129ca6149be45e5 (reference test vector)
+
 class HashTable:
-    def __init__(self, size):
+    def __init__(self, size, hash_func=sum_ascii_hash):
         self.size = size
+        self.hash_func = hash_func
         self.hash_table = [[] for _ in range(size)]
         
     def hash_function(self, key):
-        sum_of_ascii = sum([ord(char) for char in key])
-        return sum_of_ascii % self.size
+        return self.hash_func(key) % self.size
     
     def set(self, key, value):
         hash_key = self.hash_function(key)
@@ -31,13 +140,15 @@ class HashTable:
                     break
             if key_exists:
                 if value in slot[i][1]:
-                    return
+                    return False
                 else:
                     slot[i] = ((key, value))
+                    return False
             else:
                 slot.append((key, value))
         else:
             self.hash_table[hash_key] = [(key, value)]
+        return True
             
     def get(self, key):
         hash_key = self.hash_function(key)
@@ -65,6 +176,17 @@ class HashTable:
         for index, slot in enumerate(self.hash_table):
             print(index, slot)
             
+    def load_factor(self):
+        return sum(len(slot) for slot in self.hash_table) / self.size
+    
+    def probe_length(self, key):
+        # Number of entries compared to find the key (or to find out it is missing)
+        slot = self.hash_table[self.hash_function(key)]
+        for i, (k, v) in enumerate(slot):
+            if k == key:
+                return i + 1
+        return len(slot)
+            
 # Create a Hash Table with a size of 10
 # hash_table = HashTable(10)
 # hash_table.set("John", 23)
@@ -82,50 +204,85 @@ class HashTable:
 # Separate Chaining:
 # In the Separate Chaining method, each bucket stores a linked list of key-value pairs.
 # When a collision occurs, the key-value pair is added to the linked list.
+# This table is also a multimap: every key keeps a collection of all the values set for it.
+# The values are stored as the keys of a dict (value -> None), used as an insertion-ordered set:
+# - add/remove/contains a value is O(1) (a list needs O(k) for `value in values` and copies itself on `values + [value]`)
+# - the values still come back in the order they were added
+# - values must be hashable
 # Example:
 class HashTable:
-    def __init__(self, size):
+    def __init__(self, size, hash_func=sum_ascii_hash):
         self.size = size
+        self.hash_func = hash_func
         self.hash_table = [[] for _ in range(size)]
+        # Bumped every time a key is added or removed, so iterators can tell the table changed under them
+        self.modifications = 0
         
     def hash_function(self, key):
-        count_ascii = sum([ord(char) for char in key])
-        return count_ascii % self.size
+        return self.hash_func(key) % self.size
     
     def display(self):
         print("Hash table:")
-        for i, kv in enumerate(self.hash_table):
-            print(i, kv)
+        for i, slot in enumerate(self.hash_table):
+            print(i, [(k, list(values)) for k, values in slot])
     
     def set(self, key, value):
-        hash_key = self.hash_function(key)
-        slot = self.hash_table[hash_key]
-        key_exists = False
-        if slot:
-            for i, kv in enumerate(slot):
-                k, v = kv
-                if key == k:
-                    key_exists = True
-                    break
-            if key_exists:
-                if value in slot[i][1]:
-                    return
-                else:
-                    slot[i] = ((key, slot[i][1] + [value]))
-            else:
-                slot.append((key, [value]))
-        else:
-            self.hash_table[hash_key] = [(key, [value])]
+        values = self._values(key)
+        if values is None:
+            self.hash_table[self.hash_function(key)].append((key, {value: None}))
+            self.modifications += 1
+            return True
+        values[value] = None
+        return False
             
     def get(self, key):
-        hash_key = self.hash_function(key)
-        slot = self.hash_table[hash_key]
-        if slot:
-            for k, v in slot:
-                if key == k:
-                    return v
-        else:
+        # Copies the values into a list: O(k), use get_all() to read them without copying
+        values = self._values(key)
+        if values is None:
+            return None
+        return list(values)
+    
+    def get_all(self, key):
+        # Read-only live view of the values, in insertion order
+        values = self._values(key)
+        if values is None:
             return None
+        return values.keys()
+    
+    def count(self, key):
+        values = self._values(key)
+        return 0 if values is None else len(values)
+    
+    def contains(self, key, value):
+        values = self._values(key)
+        return values is not None and value in values
+    
+    def remove_value(self, key, value):
+        values = self._values(key)
+        if values is None or value not in values:
+            return False
+        del values[value]
+        if not values:
+            self.delete(key)
+        return True
+    
+    def _values(self, key):
+        slot = self.hash_table[self.hash_function(key)]
+        for k, values in slot:
+            if key == k:
+                return values
+        return None
+    
+    def load_factor(self):
+        return sum(len(slot) for slot in self.hash_table) / self.size
+    
+    def probe_length(self, key):
+        # Chain length walked to find the key (or to find out it is missing)
+        slot = self.hash_table[self.hash_function(key)]
+        for i, (k, values) in enumerate(slot):
+            if k == key:
+                return i + 1
+        return len(slot)
         
     def delete(self, key):
         hash_key = self.hash_function(key)
@@ -135,8 +292,79 @@ class HashTable:
                 k, v = kv
                 if key == k:
                     del slot[i]
+                    self.modifications += 1
                     return True
         return False
+    
+    # Iteration: walk the buckets lazily, one key at a time, nothing is copied into a list.
+    # Like a dict, adding or deleting a key while iterating raises RuntimeError instead of skipping or repeating keys.
+    # Each key comes with the same live view of its values as get_all()
+    def items(self):
+        modifications = self.modifications
+        for slot in self.hash_table:
+            for key, values in slot:
+                if self.modifications != modifications:
+                    raise RuntimeError("HashTable changed during iteration")
+                yield key, values.keys()
+    
+    def keys(self):
+        for key, values in self.items():
+            yield key
+    
+    def values(self):
+        for key, values in self.items():
+            yield values
+    
+    def __iter__(self):
+        return self.keys()
+    
+    # Batch operations: hash all the keys in one pass, group them by bucket,
+    # then walk every bucket once for the whole group instead of once per key.
+    def set_many(self, items):
+        for batch in batches(items):
+            buckets = {}
+            for key, value in batch:
+                buckets.setdefault(self.hash_function(key), []).append((key, value))
+            for hash_key, group in buckets.items():
+                slot = self.hash_table[hash_key]
+                keys = dict(slot)
+                for key, value in group:
+                    values = keys.get(key)
+                    if values is None:
+                        keys[key] = values = {}
+                        slot.append((key, values))
+                        self.modifications += 1
+                    values[value] = None
+                        
+    def get_many(self, keys):
+        keys = list(keys)
+        results = [None] * len(keys)
+        buckets = {}
+        for position, key in enumerate(keys):
+            buckets.setdefault(self.hash_function(key), []).append(position)
+        for hash_key, positions in buckets.items():
+            slot = dict(self.hash_table[hash_key])
+            for position in positions:
+                values = slot.get(keys[position])
+                results[position] = None if values is None else list(values)
+        return results
+    
+    def delete_many(self, keys):
+        deleted = 0
+        buckets = {}
+        for key in keys:
+            buckets.setdefault(self.hash_function(key), set()).add(key)
+        for hash_key, group in buckets.items():
+            slot = self.hash_table[hash_key]
+            kept = [kv for kv in slot if kv[0] not in group]
+            deleted += len(slot) - len(kept)
+            slot[:] = kept
+        if deleted:
+            self.modifications += 1
+        return deleted
+    
+# Every class in this file is called HashTable, keep a name for the Separate Chaining one so it can be compared later
+ChainingHashTable = HashTable
             
 hash_table = HashTable(10)
 hash_table.set("John", 23)  
@@ -156,6 +384,11 @@ print(hash_table.get("John")) # Output: [23, 24]
 print(hash_table.get("Stack")) # Output: [30]
 hash_table.delete("Jane")
 hash_table.display()
+# Hot keys stay cheap: every add/remove/contains is O(1) no matter how many values the key has
+for i in range(50000):
+    hash_table.set("Hot", i)
+hash_table.remove_value("Hot", 25000)
+print(hash_table.count("Hot"), hash_table.contains("Hot", 25000)) # Output: 49999 False
 
 # Open Addressing:
 # In the Open Addressing method, when a collision occurs, find the next available slot in the hash table.
@@ -163,58 +396,2230 @@ hash_table.display()
 # 1. Linear Probing: When a collision occurs, find the next available slot by incrementing the index by 1.
 # 2. Quadratic Probing: When a collision occurs, find the next available slot by incrementing the index by 1, 4, 9, 16, and so on.
 # 3. Double Hashing: When a collision occurs, find the next available slot by using a second hash function.
+#
+# Load factor and resizing:
+# The load factor is the number of stored keys divided by the number of slots (count / size).
+# With Open Addressing every key needs its own slot, so when the load factor gets close to 1 the probe chains get very long,
+# and when it reaches 1 there is no free slot left and `set` would loop forever.
+# - Grow: when the load factor goes above max_load, allocate a new table twice as big and move every key into it.
+#   max_load must stay below 1, so the table always has a free slot for the next key.
+# - Shrink: when the load factor goes below min_load (after a lot of deletes), allocate a table half as big (or smaller).
+#
+# Incremental rehash:
+# Moving all the keys at once makes a single unlucky `set` pay O(n) for the whole resize.
+# Instead we keep the old table around and move only a few slots (rehash_step) on every set/get/delete, until the old table is drained.
+# The load is not checked again until the drain is over: the next grow or shrink starts from the count at that time.
+# So the pace is raised when the inserts the new table can still take before it gets too full (or the deletes before it
+# gets too empty) would not drain the old table at rehash_step slots per call: the work is spread out, never done in one call.
+# While a resize is in progress:
+# - New keys are always inserted into the new table.
+# - set/get/delete look in the new table first, then in the old table.
+# - A key that was already moved still has a stale copy in the old table, so delete removes the key from both tables.
+#
+# Deleting with tombstones:
+# `get` stops probing at the first empty slot, so a delete that simply empties the slot breaks the probe chain:
+# every key stored after the hole (e.g. "Jhon" that collided with "John") cannot be found anymore.
+# Instead delete leaves a tombstone in the slot:
+# - get/delete skip over tombstones and keep probing.
+# - set reuses the first tombstone it meets once it knows the key is not in the table.
+# Tombstones still make probe chains longer, so when they take more than max_tombstones of the slots,
+# the table is compacted: it is rebuilt at the same size without the tombstones, using the same incremental rehash as a resize.
+#
+# Probing policies (the probing argument):
+# - "linear": visit home, home + 1, home + 2, ... Simple and cache-friendly, but keys pile up in long clusters (primary clustering).
+# - "quadratic": visit home, home + 1, home + 3, home + 6, ... (triangular numbers instead of 1, 4, 9, 16,
+#   because with a power of two table size the triangular numbers are guaranteed to visit every slot).
+# - "double": visit home, home + step, home + 2 * step, ... where step comes from a second hash function
+#   (here: the bits of the hash that the home slot did not use). The step is odd, so it visits every slot of a power of two table.
+# - "robin_hood": linear probing that "takes from the rich and gives to the poor".
+#   The probe distance of an entry is how far it sits from its home slot.
+#   On insert, when the new entry is further from home than the resident entry, they swap and we keep inserting the resident.
+#   This keeps all probe distances close to the average (low variance), and a lookup can stop as soon as it meets
+#   an entry that is closer to its home than we are to ours: if our key were in the table, it would have taken that slot.
+#   Deletes shift the following entries one slot back instead of leaving tombstones (backward shift deletion).
+# The table size is always rounded up to a power of two.
+# Each slot stores (key, value, hash_value): Robin Hood needs the home slot of every resident,
+# and a resize can move the entries without calling the hash function again.
+class Tombstone:
+    def __repr__(self):
+        return "<deleted>"
+
+TOMBSTONE = Tombstone()
+
+PROBING_POLICIES = ("linear", "quadratic", "double", "robin_hood")
+
 # Example:
 class HashTable:
-    def __init__(self, size):
+    def __init__(self, size=8, max_load=0.7, min_load=0.1, rehash_step=8, hash_func=sum_ascii_hash, max_tombstones=0.2,
+                 probing="linear"):
+        if probing not in PROBING_POLICIES:
+            raise ValueError("Unknown probing policy: %s" % probing)
+        if not 0 < max_load < 1:
+            raise ValueError("max_load must be between 0 and 1 (excluded)")
+        size = 1 << max(size - 1, 1).bit_length()
         self.size = size
+        self.hash_func = hash_func
+        self.probing = probing
         self.hash_table = [None] * size
+        self.count = 0
+        self.tombstones = 0
+        self.min_size = size
+        self.max_load = max_load
+        self.min_load = min_load
+        self.max_tombstones = max_tombstones
+        self.rehash_step = rehash_step
+        # Table being drained by the incremental rehash (None when no resize is in progress)
+        self.old_table = None
+        self.old_size = 0
+        self.rehash_index = 0
+        # Bumped by every insert of a new key, delete and resize, so iterators can tell the table changed under them
+        self.modifications = 0
         
-    def hash_function(self, key):
-        sum_ascii = sum([ord(char) for char in key])
-        return sum_ascii % self.size
+    def hash_function(self, key, size=None):
+        return self.hash_func(key) % (size or self.size)
     
     def display(self):
         print("Hash Table:")
         for i, kv in enumerate(self.hash_table):
             print(i, kv)
+        if self.old_table is not None:
+            print("Old Hash Table (rehashing from slot %d):" % self.rehash_index)
+            for i, kv in enumerate(self.old_table):
+                print(i, kv)
+                
+    def load_factor(self):
+        return self.count / self.size
             
     def set(self, key, value):
-        hash_key = self.hash_function(key)
-        if self.hash_table[hash_key] is None:
-            self.hash_table[hash_key] = (key, value)
-        else:
-            next_slot = self.rehash(hash_key)
-            while self.hash_table[next_slot] is not None:
-                next_slot = self.rehash(next_slot)
-            self.hash_table[next_slot] = (key, value)
+        self._rehash_step()
+        hash_value = self.hash_func(key)
+        index = self._find(self.hash_table, self.size, key, hash_value)
+        if index is not None:
+            self.hash_table[index] = (key, value, hash_value)
+            return False
+        if self.old_table is not None:
+            index = self._find(self.old_table, self.old_size, key, hash_value)
+            if index is not None:
+                self.old_table[index] = (key, value, hash_value)
+                return False
+        self._insert(key, value, hash_value)
+        self.count += 1
+        self.modifications += 1
+        self._check_load()
+        return True
             
     def get(self, key):
-        hash_key = self.hash_function(key)
-        start_slot = hash_key
-        while self.hash_table[hash_key] is not None:
-            k, v = self.hash_table[hash_key]
-            if k == key:
-                return v
-            hash_key = self.rehash(hash_key)
-            if hash_key == start_slot:
+        self._rehash_step()
+        return self.peek(key)
+    
+    def peek(self, key):
+        # Same as get, but it does not advance the incremental rehash, so it never modifies the table
+        hash_value = self.hash_func(key)
+        index = self._find(self.hash_table, self.size, key, hash_value)
+        if index is not None:
+            return self.hash_table[index][1]
+        if self.old_table is not None:
+            index = self._find(self.old_table, self.old_size, key, hash_value)
+            if index is not None:
+                return self.old_table[index][1]
+        return None
+    
+    def delete(self, key):
+        self._rehash_step()
+        found = self._delete(key, self.hash_func(key))
+        if found:
+            self._check_load()
+        return found
+    
+    # Batch operations:
+    # - Pre-size the table once for the whole batch instead of growing through several resizes.
+    # - Hash the keys in one pass and skip the per-call rehash step and load check.
+    # Open Addressing has no buckets to group the keys by: every key has its own probe sequence.
+    def reserve(self, n):
+        needed = self.count + n
+        if needed <= self.max_load * self.size:
+            return
+        self._finish_rehash()
+        new_size = self.size
+        while needed > self.max_load * new_size:
+            new_size *= 2
+        self._start_rehash(new_size)
+        self._finish_rehash()
+        
+    def set_many(self, items):
+        for batch in batches(items):
+            self.reserve(len(batch))
+            hash_func = self.hash_func
+            hashes = [hash_func(key) for key, value in batch]
+            for (key, value), hash_value in zip(batch, hashes):
+                index = self._find(self.hash_table, self.size, key, hash_value)
+                if index is not None:
+                    self.hash_table[index] = (key, value, hash_value)
+                    continue
+                if self.old_table is not None:
+                    index = self._find(self.old_table, self.old_size, key, hash_value)
+                    if index is not None:
+                        self.old_table[index] = (key, value, hash_value)
+                        continue
+                self._insert(key, value, hash_value)
+                self.count += 1
+                self.modifications += 1
+        self._check_load()
+        
+    def get_many(self, keys):
+        hash_func = self.hash_func
+        results = []
+        for key in keys:
+            hash_value = hash_func(key)
+            index = self._find(self.hash_table, self.size, key, hash_value)
+            if index is not None:
+                results.append(self.hash_table[index][1])
+                continue
+            if self.old_table is not None:
+                index = self._find(self.old_table, self.old_size, key, hash_value)
+                if index is not None:
+                    results.append(self.old_table[index][1])
+                    continue
+            results.append(None)
+        return results
+    
+    def delete_many(self, keys):
+        hash_func = self.hash_func
+        deleted = 0
+        for key in keys:
+            if self._delete(key, hash_func(key)):
+                deleted += 1
+        self._check_load()
+        return deleted
+    
+    def _delete(self, key, hash_value):
+        found = False
+        index = self._find(self.hash_table, self.size, key, hash_value)
+        if index is not None:
+            if self.probing == "robin_hood":
+                self._backward_shift_delete(index)
+            else:
+                self.hash_table[index] = TOMBSTONE
+                self.tombstones += 1
+            found = True
+        if self.old_table is not None:
+            index = self._find(self.old_table, self.old_size, key, hash_value)
+            if index is not None:
+                if self.probing == "robin_hood":
+                    # Shifting entries back could move them behind rehash_index, so the old table keeps
+                    # a dead entry with the same hash: probe distances stay valid and the rehash skips it
+                    self.old_table[index] = (TOMBSTONE, None, hash_value)
+                else:
+                    self.old_table[index] = TOMBSTONE
+                found = True
+        if found:
+            self.count -= 1
+            self.modifications += 1
+        return found
+    
+    def rehash(self, old_hash, size=None):
+        return (old_hash + 1) % (size or self.size)
+    
+    def probe_sequence(self, hash_value, size=None):
+        # Yields the slots to visit for a hash value, every slot at most once
+        size = size or self.size
+        index = hash_value % size
+        if self.probing == "quadratic":
+            for i in range(1, size + 1):
+                yield index
+                index = (index + i) % size
+        elif self.probing == "double":
+            step = (hash_value // size) % size | 1
+            for _ in range(size):
+                yield index
+                index = (index + step) % size
+        else:
+            for _ in range(size):
+                yield index
+                index = self.rehash(index, size)
+                
+    def probe_distance(self, entry, index, size=None):
+        size = size or self.size
+        return (index - entry[2] % size) % size
+    
+    def probe_length(self, key):
+        # Number of slots visited to find the key (or to find out it is missing), in both tables during a resize.
+        # Same walk as _find, kept separate so the stats cost nothing when they are disabled.
+        hash_value = self.hash_func(key)
+        length = 0
+        for table, size in ((self.hash_table, self.size), (self.old_table, self.old_size)):
+            if table is None:
+                continue
+            distance = 0
+            for index in self.probe_sequence(hash_value, size):
+                length += 1
+                entry = table[index]
+                if entry is None:
+                    break
+                if entry is not TOMBSTONE:
+                    if entry[2] == hash_value and entry[0] == key:
+                        return length
+                    if self.probing == "robin_hood" and self.probe_distance(entry, index, size) < distance:
+                        break
+                distance += 1
+        return length
+    
+    def _find(self, table, size, key, hash_value):
+        robin_hood = self.probing == "robin_hood"
+        distance = 0
+        for index in self.probe_sequence(hash_value, size):
+            entry = table[index]
+            if entry is None:
                 return None
+            if entry is not TOMBSTONE:
+                if entry[2] == hash_value and entry[0] == key:
+                    return index
+                if robin_hood and self.probe_distance(entry, index, size) < distance:
+                    # Early termination: the key would have taken this slot from a richer entry
+                    return None
+            distance += 1
+        return None
+    
+    def _insert(self, key, value, hash_value):
+        # Only called for keys that are not in the table, so the first free slot or tombstone can be used
+        if self.probing == "robin_hood":
+            self._robin_hood_insert((key, value, hash_value))
+            return
+        for index in self.probe_sequence(hash_value):
+            entry = self.hash_table[index]
+            if entry is None or entry is TOMBSTONE:
+                if entry is TOMBSTONE:
+                    self.tombstones -= 1
+                self.hash_table[index] = (key, value, hash_value)
+                return
+        raise RuntimeError("HashTable is full")
+            
+    def _robin_hood_insert(self, entry):
+        index = entry[2] % self.size
+        distance = 0
+        # Every slot is visited at most once, so a full table raises instead of looping forever
+        for _ in range(self.size):
+            resident = self.hash_table[index]
+            if resident is None:
+                self.hash_table[index] = entry
+                return
+            resident_distance = self.probe_distance(resident, index)
+            if resident_distance < distance:
+                # Take from the rich: the new entry gets this slot and the resident continues probing
+                self.hash_table[index] = entry
+                entry = resident
+                distance = resident_distance
+            index = self.rehash(index)
+            distance += 1
+        raise RuntimeError("HashTable is full")
+            
+    def _backward_shift_delete(self, index):
+        next_index = self.rehash(index)
+        while True:
+            entry = self.hash_table[next_index]
+            if entry is None or self.probe_distance(entry, next_index) == 0:
+                break
+            self.hash_table[index] = entry
+            index = next_index
+            next_index = self.rehash(next_index)
+        self.hash_table[index] = None
+        
+    def _check_load(self):
+        if self.old_table is not None:
+            # _rehash_step paces the drain so it ends before the new table fills up,
+            # the next resize (sized from the count at that time) waits for it
+            return
+        if self.count > self.max_load * self.size:
+            self._start_rehash(self.size * 2)
+        elif self.count < self.min_load * self.size and self.size // 2 >= self.min_size:
+            # After a mass delete, halve as many times as needed in one go
+            new_size = self.size // 2
+            while self.count < self.min_load * new_size and new_size // 2 >= self.min_size:
+                new_size //= 2
+            self._start_rehash(new_size)
+        elif self.tombstones > self.max_tombstones * self.size:
+            # Compaction: rebuild at the same size, the tombstones are not copied
+            self._start_rehash(self.size)
+            
+    def _start_rehash(self, new_size):
+        self.old_table = self.hash_table
+        self.old_size = self.size
+        self.rehash_index = 0
+        self.size = new_size
+        self.hash_table = [None] * new_size
+        self.tombstones = 0
+        self.modifications += 1
+        
+    def _rehash_step(self, slots=None):
+        if self.old_table is None:
+            return
+        end = min(self.rehash_index + (slots or self._rehash_pace()), self.old_size)
+        for i in range(self.rehash_index, end):
+            entry = self.old_table[i]
+            if entry is not None and entry is not TOMBSTONE and entry[0] is not TOMBSTONE:
+                self._insert(entry[0], entry[1], entry[2])
+        self.rehash_index = end
+        if self.rehash_index == self.old_size:
+            self.old_table = None
+            self.old_size = 0
+            
+    def _rehash_pace(self):
+        # Slots to move on this call: rehash_step, or more when the calls left would not drain the old table at that rate.
+        # Calls left: the inserts before the new table gets too full (halfway between max_load and completely full),
+        # and, when it can shrink, the deletes before it gets too empty (half of min_load).
+        # The pace goes up after a shrink of several halvings: the old table is many times bigger than the new one.
+        headroom = int(self.size * (1 + self.max_load) / 2) - self.count
+        if self.min_load and self.size // 2 >= self.min_size:
+            headroom = min(headroom, self.count - int(self.min_load * self.size / 2))
+        remaining = self.old_size - self.rehash_index
+        return max(self.rehash_step, -(-remaining // max(headroom, 1)))
+    
+    def _finish_rehash(self):
+        self._rehash_step(self.old_size)
+
+    # Iteration: stream the slots lazily, nothing is copied into a list.
+    # A pending incremental rehash is finished first (iterating is O(n) anyway), otherwise a get() inside
+    # the loop would move entries from the old table into slots the iterator has already passed.
+    # Like a dict, adding or deleting a key (or a resize) while iterating raises RuntimeError.
+    def items(self):
+        self._finish_rehash()
+        modifications = self.modifications
+        for entry in self.hash_table:
+            if self.modifications != modifications:
+                raise RuntimeError("HashTable changed during iteration")
+            if entry is not None and entry is not TOMBSTONE:
+                yield entry[0], entry[1]
+    
+    def keys(self):
+        for key, value in self.items():
+            yield key
+    
+    def values(self):
+        for key, value in self.items():
+            yield value
+    
+    def __iter__(self):
+        return self.keys()
+
+# Time Complexity:
+# - set/get/delete: O(1) on average, the incremental rehash adds rehash_step slots of work to each call
+#   (old size / new size slots per call after a shrink of several halvings)
+# - A resize never costs O(n) inside a single call, the O(n) work is spread over the next calls
+# - Growing and shrinking by a factor of 2 keeps the amortized cost of resizing O(1) per operation
+
+# Example usage
+if __name__ == "__main__":
+    hash_table = HashTable(8)
+    for i in range(1000):
+        hash_table.set("key%d" % i, i)
+    print("Size:", hash_table.size, "Count:", hash_table.count, "Load factor: %.2f" % hash_table.load_factor())
+    print(hash_table.get("key500")) # Output: 500
+    for i in range(990):
+        hash_table.delete("key%d" % i)
+    print("Size:", hash_table.size, "Count:", hash_table.count, "Load factor: %.2f" % hash_table.load_factor())
+    print(hash_table.get("key995")) # Output: 995
+    
+    # Delete-heavy workload: the table never grows, compaction keeps the tombstones under max_tombstones
+    hash_table = HashTable(64)
+    for i in range(10000):
+        hash_table.set("item%d" % i, i)
+        hash_table.delete("item%d" % (i - 20))
+    print("Size:", hash_table.size, "Count:", hash_table.count, "Tombstones:", hash_table.tombstones)
+
+## Choosing a hash function with data:
+# benchmark_hash_functions() runs every hash function over a list of real keys (a key corpus) and reports:
+# - Bucket occupancy histogram: how many buckets hold 0, 1, 2, 3, 4+ keys when n keys go into n buckets (Separate Chaining).
+#   A random-looking hash function gets close to ~37% empty, ~37% with 1 key, ~18% with 2 keys, ~6% with 3 keys.
+# - Max chain length: the longest bucket, the worst case of a Separate Chaining lookup.
+# - Max probe length: the longest Linear Probing sequence in a table with 2n slots (0.5 load factor).
+# - ops/sec: set + get of every key on the Open Addressing HashTable using that hash function.
+import itertools
+
+def load_key_corpus(path=None, limit=None):
+    # One key per line, e.g. /usr/share/dict/words or a dump of user ids from production
+    if path is not None:
+        with open(path, encoding="utf-8") as file:
+            keys = [line.strip() for line in file if line.strip()]
+    else:
+        # Anagrams and sequential ids are the worst case for the sum of ASCII codes
+        keys = ["".join(p) for p in itertools.permutations("johndoe", 5)]
+        keys += ["user%d" % i for i in range(10000)]
+    keys = list(dict.fromkeys(keys))
+    return keys[:limit] if limit else keys
+
+def bucket_stats(keys, hash_func, buckets):
+    counts = [0] * buckets
+    for key in keys:
+        counts[hash_func(key) % buckets] += 1
+    return Counter(counts), max(counts)
+
+def max_probe_length(keys, hash_func, slots):
+    table = [False] * slots
+    longest = 0
+    for key in keys:
+        index = hash_func(key) % slots
+        probes = 0
+        while table[index]:
+            index = (index + 1) % slots
+            probes += 1
+        table[index] = True
+        longest = max(longest, probes)
+    return longest
+
+def benchmark_hash_functions(keys, hash_funcs=None):
+    keys = list(dict.fromkeys(keys))
+    if hash_funcs is None:
+        hash_funcs = {
+            "sum_ascii": sum_ascii_hash,
+            "seeded_hash": make_seeded_hash(),
+            "fnv1a": fnv1a_hash,
+            "siphash": make_siphash(),
+        }
+    n = len(keys)
+    print("Keys:", n)
+    for name, hash_func in hash_funcs.items():
+        histogram, max_chain = bucket_stats(keys, hash_func, n)
+        max_probe = max_probe_length(keys, hash_func, 2 * n)
+        hash_table = HashTable(2 * n, max_load=0.99, min_load=0, hash_func=hash_func)
+        start = time.perf_counter()
+        for key in keys:
+            hash_table.set(key, key)
+        for key in keys:
+            hash_table.get(key)
+        ops_per_sec = 2 * n / (time.perf_counter() - start)
+        occupancy = [histogram[0], histogram[1], histogram[2], histogram[3], sum(c for size, c in histogram.items() if size >= 4)]
+        print("%-12s max chain: %-5d max probe: %-6d ops/sec: %10.0f" % (name, max_chain, max_probe, ops_per_sec))
+        print("%-12s buckets with 0/1/2/3/4+ keys: %s" % ("", " / ".join(str(c) for c in occupancy)))
+
+# Example usage
+if __name__ == "__main__":
+    benchmark_hash_functions(load_key_corpus(limit=3000))
+    # benchmark_hash_functions(load_key_corpus("/usr/share/dict/words"))
+
+## Comparing probing policies:
+# A miss is the worst case of Open Addressing: the probe only stops at an empty slot (or, for Robin Hood, at a richer entry).
+# benchmark_probe_policies() fills a table to each load factor without resizing and times get() for keys that are not in it.
+def benchmark_probe_policies(size=4096, loads=(0.5, 0.6, 0.7, 0.8, 0.9, 0.95), misses=2000, hash_func=None):
+    hash_func = hash_func or make_seeded_hash(42)
+    miss_keys = ["miss%d" % i for i in range(misses)]
+    print("Miss latency (microseconds per get):")
+    print("%-12s" % "load" + "".join("%10.2f" % load for load in loads))
+    for probing in PROBING_POLICIES:
+        row = "%-12s" % probing
+        for load in loads:
+            hash_table = HashTable(size, max_load=0.99, min_load=0, hash_func=hash_func, probing=probing)
+            for i in range(int(size * load)):
+                hash_table.set("key%d" % i, i)
+            start = time.perf_counter()
+            for key in miss_keys:
+                hash_table.get(key)
+            row += "%10.2f" % ((time.perf_counter() - start) / misses * 1e6)
+        print(row)
+
+# Example usage
+if __name__ == "__main__":
+    benchmark_probe_policies(size=1024, misses=500)
+
+## Compact layout:
+# Storing every entry as a tuple costs a lot of memory: a (key, value, hash_value) tuple is a 64 bytes object,
+# plus an 8 bytes pointer to it in the table, plus the pointer chasing to reach it on every probe.
+# CPython's own dict uses a compact layout instead (since Python 3.6):
+# - A sparse index array of small integers (1, 2, 4 or 8 bytes per slot, from the array module) that is probed like before.
+#   Each slot holds EMPTY, DUMMY (deleted) or the position of the entry in the dense arrays.
+# - Dense parallel arrays for keys, values and hashes, filled in insertion order.
+#   The hashes are stored as raw 64-bit integers in an array("Q"), not as Python int objects.
+# Benefits:
+# - Only the index is sparse: about 1/3 of it is kept empty, but its slots are tiny compared to tuples.
+# - Cached hashes: a lookup compares the hashes before calling ==, and a resize rebuilds the index without calling the hash function.
+# - Iterating the dense arrays gives the keys in insertion order for free.
+# Probing follows CPython: index = 5 * index + 1 + perturb, where perturb feeds the high bits of the hash in, 5 bits at a time.
+# Resizing follows CPython too: a delete leaves a hole in the dense arrays, and a new key is always appended, even when it reuses
+# a DUMMY slot of the index. So the resize is triggered by the length of the dense arrays (dk_nentries), not by the live keys:
+# once it reaches 2/3 of the slots, the table is rebuilt (and compacted) with the holes dropped.
+from array import array
+
+EMPTY = -1
+DUMMY = -2
+
+def usable_entries(size):
+    # The dense arrays of a table with this many slots hold at most 2/3 of size entries
+    return size * 2 // 3
+
+def index_typecode(max_entry):
+    # Smallest signed integer type that can hold every entry position up to max_entry
+    if max_entry <= 0x7F:
+        return "b"
+    if max_entry <= 0x7FFF:
+        return "h"
+    if max_entry <= 0x7FFFFFFF:
+        return "i"
+    return "q"
+
+class CompactHashTable:
+    def __init__(self, size=8, hash_func=sum_ascii_hash):
+        self.hash_func = hash_func
+        self.size = 1 << max(size - 1, 1).bit_length()
+        self.indices = array(index_typecode(usable_entries(self.size)), [EMPTY]) * self.size
+        self.entry_keys = []
+        self.entry_values = []
+        self.entry_hashes = array("Q")
+        self.count = 0
+        self.modifications = 0
+        
+    def hash_function(self, key):
+        return self.hash_func(key) % self.size
+    
+    def display(self):
+        print("Indices:", list(self.indices))
+        print("Entries:")
+        for i, (key, value, hash_value) in enumerate(zip(self.entry_keys, self.entry_values, self.entry_hashes)):
+            print(i, (key, value, hash_value))
+            
+    def load_factor(self):
+        return self.count / self.size
+    
+    def set(self, key, value):
+        hash_value = self.hash_func(key) & MASK_64
+        slot, entry = self._lookup(key, hash_value)
+        if entry >= 0:
+            self.entry_values[entry] = value
+            return False
+        self.indices[slot] = len(self.entry_keys)
+        self.entry_keys.append(key)
+        self.entry_values.append(value)
+        self.entry_hashes.append(hash_value)
+        self.count += 1
+        self.modifications += 1
+        # Deleted entries still take room in the dense arrays, so they count towards the resize
+        if len(self.entry_keys) >= usable_entries(self.size):
+            self._resize()
+        return True
+            
+    def get(self, key):
+        slot, entry = self._lookup(key, self.hash_func(key) & MASK_64)
+        if entry >= 0:
+            return self.entry_values[entry]
         return None
     
     def delete(self, key):
-        hash_key = self.hash_function(key)
-        start_slot = hash_key
-        while self.hash_table[hash_key] is not None:
-            k, v = self.hash_table[hash_key]
-            if k == key:
-                self.hash_table[hash_key] = None
-                return True
-            hash_key = self.rehash(hash_key)
-            if hash_key == start_slot:
+        slot, entry = self._lookup(key, self.hash_func(key) & MASK_64)
+        if entry < 0:
+            return False
+        self.indices[slot] = DUMMY
+        self.entry_keys[entry] = TOMBSTONE
+        self.entry_values[entry] = None
+        self.count -= 1
+        self.modifications += 1
+        return True
+    
+    # Iteration walks the dense arrays in insertion order, like a dict
+    def items(self):
+        modifications = self.modifications
+        for key, value in zip(self.entry_keys, self.entry_values):
+            if self.modifications != modifications:
+                raise RuntimeError("HashTable changed during iteration")
+            if key is not TOMBSTONE:
+                yield key, value
+                
+    def keys(self):
+        for key, value in self.items():
+            yield key
+            
+    def values(self):
+        for key, value in self.items():
+            yield value
+            
+    def __iter__(self):
+        return self.keys()
+                
+    def probe_length(self, key):
+        hash_value = self.hash_func(key) & MASK_64
+        mask = self.size - 1
+        perturb = hash_value
+        slot = hash_value & mask
+        length = 1
+        while True:
+            entry = self.indices[slot]
+            if entry == EMPTY or (entry >= 0 and self.entry_hashes[entry] == hash_value and self.entry_keys[entry] == key):
+                return length
+            perturb >>= 5
+            slot = (5 * slot + 1 + perturb) & mask
+            length += 1
+                
+    def _lookup(self, key, hash_value):
+        # Returns (slot, entry): the slot of the key and its position in the dense arrays,
+        # or the slot where the key should be inserted and -1 when the key is missing
+        indices = self.indices
+        mask = self.size - 1
+        perturb = hash_value
+        slot = hash_value & mask
+        free_slot = -1
+        while True:
+            entry = indices[slot]
+            if entry == EMPTY:
+                return (slot if free_slot < 0 else free_slot), -1
+            if entry == DUMMY:
+                if free_slot < 0:
+                    free_slot = slot
+            elif self.entry_hashes[entry] == hash_value and self.entry_keys[entry] == key:
+                return slot, entry
+            perturb >>= 5
+            slot = (5 * slot + 1 + perturb) & mask
+            
+    def _resize(self):
+        # Drop the deleted entries from the dense arrays, then rebuild the index from the cached hashes
+        keys, values, hashes = [], [], array("Q")
+        for key, value, hash_value in zip(self.entry_keys, self.entry_values, self.entry_hashes):
+            if key is not TOMBSTONE:
+                keys.append(key)
+                values.append(value)
+                hashes.append(hash_value)
+        new_size = 8
+        while new_size < len(keys) * 3:
+            new_size <<= 1
+        indices = array(index_typecode(usable_entries(new_size)), [EMPTY]) * new_size
+        mask = new_size - 1
+        for entry, hash_value in enumerate(hashes):
+            perturb = hash_value
+            slot = hash_value & mask
+            while indices[slot] != EMPTY:
+                perturb >>= 5
+                slot = (5 * slot + 1 + perturb) & mask
+            indices[slot] = entry
+        self.size = new_size
+        self.indices = indices
+        self.entry_keys, self.entry_values, self.entry_hashes = keys, values, hashes
+        
+# Time Complexity:
+# - set/get/delete: O(1) on average
+# - resize: O(n), but it only walks the dense arrays and never calls the hash function
+#
+# Memory vs lookup speed:
+# benchmark_compact_layout() builds the same table with the Separate Chaining buckets of tuples,
+# the Open Addressing table of tuples and the compact layout, and reports the bytes per key and the get() latency.
+import tracemalloc
+
+def benchmark_compact_layout(n=100000, hash_func=None):
+    hash_func = hash_func or make_seeded_hash(42)
+    items = [("key%d" % i, i) for i in range(n)]
+    tables = {
+        "chaining": lambda: ChainingHashTable(n, hash_func=hash_func),
+        "open addressing": lambda: HashTable(8, hash_func=hash_func),
+        "compact": lambda: CompactHashTable(8, hash_func=hash_func),
+    }
+    for name, make_table in tables.items():
+        tracemalloc.start()
+        hash_table = make_table()
+        for key, value in items:
+            hash_table.set(key, value)
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        start = time.perf_counter()
+        for key, value in items:
+            hash_table.get(key)
+        elapsed = time.perf_counter() - start
+        print("%-16s %6.1f bytes per key   get: %.2f microseconds" % (name, memory / n, elapsed / n * 1e6))
+
+# Example usage
+if __name__ == "__main__":
+    hash_table = CompactHashTable()
+    hash_table.set("John", 23)
+    hash_table.set("Jhon", 25)
+    hash_table.set("Jack", 27)
+    hash_table.delete("Jhon")
+    hash_table.set("Jane", 29)
+    print(list(hash_table.items())) # Output: [('John', 23), ('Jack', 27), ('Jane', 29)]
+    benchmark_compact_layout(20000)
+
+## Sharing a hash table between threads:
+# None of the tables above is thread-safe: a set() in one thread can resize the table while a get() in another thread is probing it.
+# Wrapping every call in one global lock (LockedHashTable) is safe, but then only one thread can use the table at a time.
+# Sharding with striped locks:
+# - The keys are split across N independent shards (sub-tables), each shard has its own lock.
+# - The shard is picked with a separate seeded hash, so it does not reuse the bits the shard's own table uses for its slots.
+# - Two threads only wait for each other when they touch the same shard, and a resize only blocks its own shard.
+# Lock-free reads (optimistic, like a seqlock):
+# - Every write increments the shard version before and after changing the table, so the version is odd while a write is running.
+# - get() reads the version, peeks the table without the lock, and reads the version again.
+#   If the version is even and did not change, no write happened in between and the value is correct.
+#   Otherwise (or if the peek tripped over a half-done resize) it retries with the lock.
+# In CPython the GIL still runs one thread at a time, so sharding mostly removes lock contention and convoying;
+# the benefit grows on free-threaded Python or when the callers release the GIL between operations.
+import threading
+
+class Shard:
+    def __init__(self, table):
+        self.table = table
+        self.lock = threading.Lock()
+        self.version = 0
+
+class ShardedHashTable:
+    def __init__(self, shards=16, size=8, hash_func=sum_ascii_hash, **table_options):
+        self.shard_hash = make_seeded_hash()
+        self.shards = [Shard(HashTable(size, hash_func=hash_func, **table_options)) for _ in range(shards)]
+        
+    def _shard(self, key):
+        return self.shards[self.shard_hash(key) % len(self.shards)]
+    
+    def set(self, key, value):
+        shard = self._shard(key)
+        with shard.lock:
+            shard.version += 1
+            try:
+                return shard.table.set(key, value)
+            finally:
+                shard.version += 1
+                
+    def get(self, key):
+        shard = self._shard(key)
+        version = shard.version
+        if version % 2 == 0:
+            try:
+                value = shard.table.peek(key)
+            except (IndexError, TypeError):
+                value = None
+                version = -1
+            if shard.version == version:
+                return value
+        with shard.lock:
+            return shard.table.peek(key)
+        
+    def delete(self, key):
+        shard = self._shard(key)
+        with shard.lock:
+            shard.version += 1
+            try:
+                return shard.table.delete(key)
+            finally:
+                shard.version += 1
+                
+    def count(self):
+        return sum(shard.table.count for shard in self.shards)
+    
+    def load_factor(self):
+        return self.count() / sum(shard.table.size for shard in self.shards)
+    
+    def probe_length(self, key):
+        return self._shard(key).table.probe_length(key)
+    
+    def display(self):
+        for i, shard in enumerate(self.shards):
+            print("Shard", i)
+            shard.table.display()
+            
+    def items(self):
+        # Streams shard by shard, each shard is copied under its lock: holding the lock while the caller's
+        # loop body runs would block that shard's writers (or deadlock if the loop writes to the same shard).
+        # Writers never make it raise, but keys written to a shard after it was copied are not seen.
+        for shard in self.shards:
+            with shard.lock:
+                entries = list(shard.table.items())
+            yield from entries
+            
+    def keys(self):
+        for key, value in self.items():
+            yield key
+            
+    def values(self):
+        for key, value in self.items():
+            yield value
+            
+    def __iter__(self):
+        return self.keys()
+
+class LockedHashTable:
+    def __init__(self, size=8, hash_func=sum_ascii_hash, **table_options):
+        self.table = HashTable(size, hash_func=hash_func, **table_options)
+        self.lock = threading.Lock()
+        
+    def set(self, key, value):
+        with self.lock:
+            return self.table.set(key, value)
+            
+    def get(self, key):
+        with self.lock:
+            return self.table.get(key)
+        
+    def delete(self, key):
+        with self.lock:
+            return self.table.delete(key)
+        
+    def count(self):
+        return self.table.count
+    
+    def load_factor(self):
+        with self.lock:
+            return self.table.load_factor()
+        
+    def probe_length(self, key):
+        with self.lock:
+            return self.table.probe_length(key)
+    
+# Stress test: every writer thread owns a range of keys, sets them, overwrites them, deletes half of them,
+# while reader threads keep reading all the keys. At the end every key must hold its last value or be gone.
+def stress_test_sharded(hash_table, writers=8, readers=8, keys_per_writer=2000):
+    errors = []
+    done = threading.Event()
+    
+    def writer(w):
+        try:
+            keys = ["w%d-%d" % (w, i) for i in range(keys_per_writer)]
+            for i, key in enumerate(keys):
+                hash_table.set(key, i)
+            for i, key in enumerate(keys):
+                hash_table.set(key, -i)
+                if hash_table.get(key) != -i:
+                    errors.append("lost update of %s" % key)
+            for key in keys[::2]:
+                if not hash_table.delete(key):
+                    errors.append("could not delete %s" % key)
+        except Exception as error:
+            errors.append(repr(error))
+            
+    def reader(r):
+        try:
+            while not done.is_set():
+                for w in range(writers):
+                    value = hash_table.get("w%d-%d" % (w, r % keys_per_writer))
+                    if value is not None and abs(value) != r % keys_per_writer:
+                        errors.append("torn read of w%d-%d" % (w, r))
+        except Exception as error:
+            errors.append(repr(error))
+            
+    writer_threads = [threading.Thread(target=writer, args=(w,)) for w in range(writers)]
+    reader_threads = [threading.Thread(target=reader, args=(r,)) for r in range(readers)]
+    for thread in writer_threads + reader_threads:
+        thread.start()
+    for thread in writer_threads:
+        thread.join()
+    done.set()
+    for thread in reader_threads:
+        thread.join()
+    for w in range(writers):
+        for i in range(keys_per_writer):
+            expected = None if i % 2 == 0 else -i
+            if hash_table.get("w%d-%d" % (w, i)) != expected:
+                errors.append("wrong final value of w%d-%d" % (w, i))
+    if hash_table.count() != writers * (keys_per_writer // 2):
+        errors.append("wrong count %d" % hash_table.count())
+    if errors:
+        raise AssertionError("%d errors, first: %s" % (len(errors), errors[0]))
+    print("Stress test passed")
+
+# Throughput: 90% get / 10% set on a shared key space, with 1 to 32 threads.
+def benchmark_sharded(thread_counts=(1, 2, 4, 8, 16, 32), ops_per_thread=20000, keys=10000, hash_func=None):
+    hash_func = hash_func or make_seeded_hash(42)
+    key_names = ["key%d" % i for i in range(keys)]
+    
+    def worker(hash_table, seed):
+        step = 7919 * (seed + 1)
+        for i in range(ops_per_thread):
+            key = key_names[(i * step) % keys]
+            if i % 10 == 0:
+                hash_table.set(key, i)
+            else:
+                hash_table.get(key)
+                
+    print("%-8s %18s %18s" % ("threads", "single lock", "sharded"))
+    for thread_count in thread_counts:
+        row = "%-8d" % thread_count
+        for hash_table in (LockedHashTable(hash_func=hash_func), ShardedHashTable(hash_func=hash_func)):
+            for key in key_names:
+                hash_table.set(key, 0)
+            threads = [threading.Thread(target=worker, args=(hash_table, t)) for t in range(thread_count)]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            row += " %12.0f ops/s" % (thread_count * ops_per_thread / (time.perf_counter() - start))
+        print(row)
+
+# Example usage
+if __name__ == "__main__":
+    stress_test_sharded(ShardedHashTable(shards=8, hash_func=fnv1a_hash), keys_per_writer=500)
+    benchmark_sharded(thread_counts=(1, 4, 16), ops_per_thread=5000)
+
+## On-disk hash table:
+# For lookup tables bigger than RAM, or that must survive a restart, the slot array can live in a memory-mapped file.
+# The operating system pages the file in and out on demand, and a restarted process only has to map the file again:
+# reopening is O(1), nothing is re-inserted.
+# Layout (two files):
+# - path.slots: a header (magic, version, number of slots, count, tombstones) followed by fixed-width slots.
+#   Every slot is 24 bytes: hash_value (8), offset of the entry in the heap (8), key length (4), value length (4).
+#   Offset 0 means empty, key length DISK_DELETED means tombstone (same Linear Probing and tombstones as HashTable).
+# - path.heap: an append-only heap of key bytes followed by value bytes. Updates append a new entry and repoint the slot.
+# Lookups are zero-copy: keys are compared and values are returned as memoryview slices of the mapped heap.
+# A view stays valid after the heap is mapped again (it grew) or the table is closed: a map that still has views
+# cannot be closed (mmap raises BufferError), so it is left to the garbage collector, which unmaps it once the
+# last view is released. Copy a value with bytes() to keep it without pinning the old map.
+# Durability:
+# - The heap file is unbuffered: the bytes of an entry reach the operating system before its slot (written through the
+#   shared map) points at them. If the process dies without close(), the reopened table has every key it had set.
+# - flush() (and close()) also fsyncs the heap and msyncs the slots: only then do the changes survive an OS crash
+#   or a power loss. Between two flush() calls the kernel may write the slot pages back before the heap pages.
+# The hash function must give the same result in every process, so the default is FNV-1a (not the seeded built-in hash).
+# Growing rebuilds the slot file from the cached hashes (the heap is never read) and swaps it in with os.replace().
+import mmap
+import struct
+
+DISK_MAGIC = b"HTBL"
+DISK_VERSION = 1
+DISK_HEADER = struct.Struct("<4sIQQQ")
+DISK_SLOT = struct.Struct("<QQII")
+DISK_DELETED = 0xFFFFFFFF
+HEAP_MAGIC = b"HTBLHEAP"
+
+def value_to_bytes(value):
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value)
+    if isinstance(value, str):
+        return value.encode("utf-8")
+    raise TypeError("DiskHashTable values must be bytes or str")
+
+class DiskHashTable:
+    def __init__(self, path, size=1024, hash_func=fnv1a_hash, max_load=0.7):
+        self.path = path
+        self.hash_func = hash_func
+        self.max_load = max_load
+        self.slots_path = path + ".slots"
+        heap_path = path + ".heap"
+        if not os.path.exists(self.slots_path):
+            with open(heap_path, "wb") as heap_file:
+                heap_file.write(HEAP_MAGIC)
+            self._create_slots(self.slots_path, 1 << max(size - 1, 1).bit_length())
+        self.heap_file = open(heap_path, "r+b", buffering=0)
+        self.heap_file.seek(0, os.SEEK_END)
+        self.heap_size = self.heap_file.tell()
+        self.heap = mmap.mmap(self.heap_file.fileno(), 0)
+        try:
+            if self.heap[:len(HEAP_MAGIC)] != HEAP_MAGIC:
+                raise ValueError("%s is not a DiskHashTable heap" % heap_path)
+            self._open_slots()
+        except ValueError:
+            self.heap.close()
+            self.heap_file.close()
+            raise
+        self.modifications = 0
+        
+    def _create_slots(self, slots_path, size):
+        with open(slots_path, "wb") as slots_file:
+            slots_file.truncate(DISK_HEADER.size + size * DISK_SLOT.size)
+            slots_file.write(DISK_HEADER.pack(DISK_MAGIC, DISK_VERSION, size, 0, 0))
+            
+    def _open_slots(self):
+        with open(self.slots_path, "r+b") as slots_file:
+            self.slots = mmap.mmap(slots_file.fileno(), 0)
+        if len(self.slots) < DISK_HEADER.size or DISK_HEADER.unpack_from(self.slots, 0)[:2] != (DISK_MAGIC, DISK_VERSION):
+            self.slots.close()
+            raise ValueError("%s is not a DiskHashTable file" % self.slots_path)
+        magic, version, self.size, self.count, self.tombstones = DISK_HEADER.unpack_from(self.slots, 0)
+        
+    def _write_header(self):
+        DISK_HEADER.pack_into(self.slots, 0, DISK_MAGIC, DISK_VERSION, self.size, self.count, self.tombstones)
+        
+    def _read_slot(self, index):
+        return DISK_SLOT.unpack_from(self.slots, DISK_HEADER.size + index * DISK_SLOT.size)
+    
+    def _write_slot(self, index, hash_value, offset, key_length, value_length):
+        DISK_SLOT.pack_into(self.slots, DISK_HEADER.size + index * DISK_SLOT.size, hash_value, offset, key_length, value_length)
+        
+    def _heap_view(self, offset, length):
+        if offset + length > len(self.heap):
+            # The heap grew since it was mapped: map it again and release the old map
+            old_heap = self.heap
+            self.heap = mmap.mmap(self.heap_file.fileno(), 0)
+            self._release_heap(old_heap)
+        return memoryview(self.heap)[offset:offset + length]
+    
+    def _release_heap(self, heap):
+        try:
+            heap.close()
+        except BufferError:
+            # Views handed out earlier still use it, it is unmapped when the last one is released
+            pass
+    
+    def _find(self, key, hash_value):
+        # Returns (index, free_index): the slot of the key, or -1 and the first free slot or tombstone
+        mask = self.size - 1
+        index = hash_value & mask
+        free_index = -1
+        for _ in range(self.size):
+            slot_hash, offset, key_length, value_length = self._read_slot(index)
+            if offset == 0:
+                return -1, (index if free_index < 0 else free_index)
+            if key_length == DISK_DELETED:
+                if free_index < 0:
+                    free_index = index
+            elif slot_hash == hash_value and key_length == len(key) and self._heap_view(offset, key_length) == key:
+                return index, -1
+            index = (index + 1) & mask
+        return -1, free_index
+    
+    def set(self, key, value):
+        key = key_to_bytes(key)
+        value = value_to_bytes(value)
+        hash_value = self.hash_func(key) & MASK_64
+        index, free_index = self._find(key, hash_value)
+        offset = self.heap_size
+        self.heap_file.write(key + value)
+        self.heap_size += len(key) + len(value)
+        if index >= 0:
+            self._write_slot(index, hash_value, offset, len(key), len(value))
+            return False
+        if self._read_slot(free_index)[2] == DISK_DELETED:
+            self.tombstones -= 1
+        self._write_slot(free_index, hash_value, offset, len(key), len(value))
+        self.count += 1
+        self.modifications += 1
+        self._write_header()
+        if self.count + self.tombstones > self.max_load * self.size:
+            self._resize(self.size * 2 if self.count > self.max_load * self.size / 2 else self.size)
+        return True
+            
+    def get(self, key):
+        key = key_to_bytes(key)
+        index, free_index = self._find(key, self.hash_func(key) & MASK_64)
+        if index < 0:
+            return None
+        slot_hash, offset, key_length, value_length = self._read_slot(index)
+        return self._heap_view(offset + key_length, value_length)
+    
+    def delete(self, key):
+        key = key_to_bytes(key)
+        index, free_index = self._find(key, self.hash_func(key) & MASK_64)
+        if index < 0:
+            return False
+        slot_hash, offset, key_length, value_length = self._read_slot(index)
+        self._write_slot(index, slot_hash, offset, DISK_DELETED, 0)
+        self.count -= 1
+        self.tombstones += 1
+        self.modifications += 1
+        self._write_header()
+        return True
+    
+    def _resize(self, new_size):
+        # Also drops the tombstones when called with the same size
+        tmp_path = self.slots_path + ".tmp"
+        self._create_slots(tmp_path, new_size)
+        with open(tmp_path, "r+b") as slots_file:
+            new_slots = mmap.mmap(slots_file.fileno(), 0)
+        mask = new_size - 1
+        for i in range(self.size):
+            slot_hash, offset, key_length, value_length = self._read_slot(i)
+            if offset == 0 or key_length == DISK_DELETED:
+                continue
+            index = slot_hash & mask
+            while DISK_SLOT.unpack_from(new_slots, DISK_HEADER.size + index * DISK_SLOT.size)[1] != 0:
+                index = (index + 1) & mask
+            DISK_SLOT.pack_into(new_slots, DISK_HEADER.size + index * DISK_SLOT.size, slot_hash, offset, key_length, value_length)
+        DISK_HEADER.pack_into(new_slots, 0, DISK_MAGIC, DISK_VERSION, new_size, self.count, 0)
+        new_slots.flush()
+        new_slots.close()
+        self.slots.close()
+        os.replace(tmp_path, self.slots_path)
+        self._open_slots()
+        
+    def load_factor(self):
+        return self.count / self.size
+    
+    def probe_length(self, key):
+        key = key_to_bytes(key)
+        hash_value = self.hash_func(key) & MASK_64
+        index = hash_value & (self.size - 1)
+        for length in range(1, self.size + 1):
+            slot_hash, offset, key_length, value_length = self._read_slot(index)
+            if offset == 0:
+                return length
+            if key_length != DISK_DELETED and slot_hash == hash_value and key_length == len(key) and self._heap_view(offset, key_length) == key:
+                return length
+            index = (index + 1) & (self.size - 1)
+        return self.size
+    
+    def display(self):
+        print("Disk Hash Table: %d slots, %d keys" % (self.size, self.count))
+        for i in range(self.size):
+            slot_hash, offset, key_length, value_length = self._read_slot(i)
+            if offset != 0 and key_length != DISK_DELETED:
+                print(i, (bytes(self._heap_view(offset, key_length)), bytes(self._heap_view(offset + key_length, value_length))))
+                
+    # Iteration reads one slot at a time and yields memoryviews of the mapped heap, like get():
+    # walking a table larger than memory only touches the pages it is reading
+    def items(self):
+        modifications = self.modifications
+        for i in range(self.size):
+            if self.modifications != modifications:
+                raise RuntimeError("HashTable changed during iteration")
+            slot_hash, offset, key_length, value_length = self._read_slot(i)
+            if offset != 0 and key_length != DISK_DELETED:
+                yield self._heap_view(offset, key_length), self._heap_view(offset + key_length, value_length)
+                
+    def keys(self):
+        for key, value in self.items():
+            yield key
+            
+    def values(self):
+        for key, value in self.items():
+            yield value
+            
+    def __iter__(self):
+        return self.keys()
+    
+    def flush(self):
+        os.fsync(self.heap_file.fileno())
+        self.slots.flush()
+        
+    def close(self):
+        self.flush()
+        self._release_heap(self.heap)
+        self.heap_file.close()
+        self.slots.close()
+        
+# Time Complexity:
+# - set/get/delete: O(1) on average, plus the page faults of the slots and heap pages that are not in memory yet
+# - reopen: O(1), the files are only mapped
+# - The heap is append-only: overwritten and deleted values stay in it until the table is rewritten
+
+# Example usage
+if __name__ == "__main__":
+    import tempfile
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "lookup")
+        hash_table = DiskHashTable(path, size=8)
+        for i in range(100):
+            hash_table.set("key%d" % i, "value%d" % i)
+        hash_table.delete("key1")
+        hash_table.close()
+        # A new process would do the same: map the files and read
+        hash_table = DiskHashTable(path)
+        print(hash_table.count, hash_table.size, bytes(hash_table.get("key42"))) # Output: 99 256 b'value42'
+        print(hash_table.get("key1")) # Output: None
+        hash_table.close()
+
+## Instrumentation:
+# When a table is slow in production, the usual suspects are a bad key distribution (long chains/probes),
+# a load factor that is too high, or expensive resizes. enable_stats() collects, for any table in this file:
+# - operations: number of set/get/delete calls
+# - probe_lengths: histogram of the chain length (Separate Chaining) or probe length (Open Addressing) of every operation
+# - collisions: operations that had to look past the first entry/slot
+# - load_factors: (time, load factor) sampled every sample_every operations
+# - resizes: old size, new size, time spent rehashing and wall time from the start to the end of each resize
+# Zero cost when disabled: nothing in set/get/delete checks for stats. enable_stats() shadows those methods
+# on the instance with instrumented wrappers, and disable_stats() removes the wrappers again.
+# The instrumented wrapper walks the chain/probe sequence a second time (probe_length), so stats roughly double the lookup cost.
+# With ShardedHashTable the counters are updated without a lock, so they are approximate under heavy concurrency.
+from collections import deque
+
+class HashTableStats:
+    def __init__(self, hash_table, sample_every=1024, max_samples=1000):
+        self.hash_table = hash_table
+        self.sample_every = sample_every
+        self.operations = Counter()
+        self.probe_lengths = Counter()
+        self.collisions = 0
+        self.load_factors = deque(maxlen=max_samples)
+        self.resizes = deque(maxlen=max_samples)
+        self.total_operations = 0
+        
+    def record(self, operation, probe_length):
+        self.operations[operation] += 1
+        self.probe_lengths[probe_length] += 1
+        if probe_length > 1:
+            self.collisions += 1
+        self.total_operations += 1
+        if self.total_operations % self.sample_every == 0:
+            self.load_factors.append((time.time(), self.hash_table.load_factor()))
+            
+    def snapshot(self):
+        return {
+            "operations": dict(self.operations),
+            "probe_lengths": dict(sorted(self.probe_lengths.items())),
+            "max_probe_length": max(self.probe_lengths, default=0),
+            "collisions": self.collisions,
+            "load_factor": self.hash_table.load_factor(),
+            "load_factors": list(self.load_factors),
+            "resizes": list(self.resizes),
+        }
+    
+def _instrument_operation(hash_table, name, stats):
+    method = getattr(type(hash_table), name)
+    def instrumented(key, *args):
+        stats.record(name, hash_table.probe_length(key))
+        return method(hash_table, key, *args)
+    return instrumented
+
+def _instrument_resize(table, stats):
+    if hasattr(table, "_start_rehash"):
+        # Incremental rehash: a resize starts in _start_rehash and ends in the _rehash_step that drains the old table
+        start_rehash = type(table)._start_rehash
+        rehash_step = type(table)._rehash_step
+        pending = {}
+        if table.old_table is not None:
+            # Enabled in the middle of a resize: time it from now on
+            pending.update(old_size=table.old_size, new_size=table.size, started=time.perf_counter(), rehash_seconds=0.0)
+        def instrumented_start_rehash(new_size):
+            pending.update(old_size=table.size, new_size=new_size, started=time.perf_counter(), rehash_seconds=0.0)
+            start_rehash(table, new_size)
+        def instrumented_rehash_step(slots=None):
+            if table.old_table is None:
+                return
+            start = time.perf_counter()
+            rehash_step(table, slots)
+            pending["rehash_seconds"] += time.perf_counter() - start
+            if table.old_table is None:
+                stats.resizes.append({
+                    "old_size": pending["old_size"],
+                    "new_size": pending["new_size"],
+                    "rehash_seconds": pending["rehash_seconds"],
+                    "wall_seconds": time.perf_counter() - pending["started"],
+                })
+        table._start_rehash = instrumented_start_rehash
+        table._rehash_step = instrumented_rehash_step
+    elif hasattr(table, "_resize"):
+        resize = type(table)._resize
+        def instrumented_resize(*args):
+            old_size = table.size
+            start = time.perf_counter()
+            resize(table, *args)
+            seconds = time.perf_counter() - start
+            stats.resizes.append({"old_size": old_size, "new_size": table.size, "rehash_seconds": seconds, "wall_seconds": seconds})
+        table._resize = instrumented_resize
+        
+def _inner_tables(hash_table):
+    if hasattr(hash_table, "shards"):
+        return [shard.table for shard in hash_table.shards]
+    if hasattr(hash_table, "table"):
+        # Wrappers like LockedHashTable keep the real table in .table
+        return _inner_tables(hash_table.table)
+    return [hash_table]
+
+def enable_stats(hash_table, sample_every=1024):
+    stats = HashTableStats(hash_table, sample_every)
+    for name in ("set", "get", "delete"):
+        setattr(hash_table, name, _instrument_operation(hash_table, name, stats))
+    for table in _inner_tables(hash_table):
+        _instrument_resize(table, stats)
+    hash_table.stats = stats
+    return stats
+
+def disable_stats(hash_table):
+    for table in [hash_table] + _inner_tables(hash_table):
+        for name in ("set", "get", "delete", "_start_rehash", "_rehash_step", "_resize"):
+            table.__dict__.pop(name, None)
+    hash_table.__dict__.pop("stats", None)
+
+# Example usage
+if __name__ == "__main__":
+    for hash_func in (sum_ascii_hash, fnv1a_hash):
+        hash_table = HashTable(8, hash_func=hash_func)
+        stats = enable_stats(hash_table)
+        for i in range(5000):
+            hash_table.set("user%d" % i, i)
+            hash_table.get("user%d" % (i // 2))
+        snapshot = stats.snapshot()
+        print(hash_func.__name__, "max probe length:", snapshot["max_probe_length"], "collisions:", snapshot["collisions"],
+              "resizes:", [(r["old_size"], r["new_size"]) for r in snapshot["resizes"]])
+        disable_stats(hash_table)
+
+## Bulk loading:
+# benchmark_bulk_load() loads the same keys one set() at a time and with set_many(), and reports the throughput of both.
+def benchmark_bulk_load(n=100000, chaining_buckets=1000, hash_func=None):
+    hash_func = hash_func or make_seeded_hash(42)
+    items = [("key%d" % i, i) for i in range(n)]
+    tables = {
+        "chaining": lambda: ChainingHashTable(chaining_buckets, hash_func=hash_func),
+        "open addressing": lambda: HashTable(8, hash_func=hash_func),
+    }
+    for name, make_table in tables.items():
+        hash_table = make_table()
+        start = time.perf_counter()
+        for key, value in items:
+            hash_table.set(key, value)
+        one_by_one = n / (time.perf_counter() - start)
+        hash_table = make_table()
+        start = time.perf_counter()
+        hash_table.set_many(iter(items))
+        batched = n / (time.perf_counter() - start)
+        print("%-16s set: %9.0f ops/sec   set_many: %9.0f ops/sec   (%.1fx)" % (name, one_by_one, batched, batched / one_by_one))
+
+# Example usage
+if __name__ == "__main__":
+    benchmark_bulk_load(20000, chaining_buckets=200)
+
+## Cuckoo hashing:
+# Chaining and probing both have a long tail: when keys cluster, some lookups walk a long chain or probe sequence.
+# Cuckoo hashing bounds the worst case instead of the average case:
+# - Every key has `ways` candidate buckets (one per hash function), and every bucket has bucket_size slots.
+# - A key is always in one of its candidate buckets (or in a tiny stash), so get/delete look at no more than
+#   ways * bucket_size slots + stash_size entries: O(1) in the worst case.
+# - set puts the key in a free slot of one of its buckets. When they are all full, it kicks a random resident out
+#   and takes its slot, the evicted key moves to one of its other buckets, possibly kicking another key, and so on
+#   (like a cuckoo chick pushing the other eggs out of the nest).
+# - The displacement loop is bounded by max_kicks. The key left homeless goes to the stash,
+#   and when the stash is full the table is rebuilt with new hash seeds and twice as many buckets.
+# With 2 ways and 4 slots per bucket the table works up to ~90% load.
+# The `ways` hash functions are derived from one hash_func call per operation, mixed with a random seed per way (splitmix64),
+# so a rebuild can pick new seeds without calling hash_func again. The default hash_func is the built-in hash.
+import random
+
+MAX_REBUILDS = 4
+
+def mix64(x):
+    # splitmix64 finalizer: spreads every input bit over the whole 64-bit output
+    x = (x + 0x9E3779B97F4A7C15) & MASK_64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK_64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK_64
+    return x ^ (x >> 31)
+
+class CuckooHashTable:
+    def __init__(self, size=8, hash_func=hash, ways=2, bucket_size=4, max_load=0.9, max_kicks=100, stash_size=4, seed=None):
+        self.size = 1 << max(size - 1, 1).bit_length()
+        self.hash_func = hash_func
+        self.ways = ways
+        self.bucket_size = bucket_size
+        self.max_load = max_load
+        self.max_kicks = max_kicks
+        self.stash_size = stash_size
+        self.random = random.Random(seed)
+        self.seeds = self._new_seeds()
+        self.slots = [None] * (self.size * bucket_size)
+        self.stash = []
+        self.count = 0
+        self.modifications = 0
+        
+    def _new_seeds(self):
+        return [self.random.getrandbits(64) for _ in range(self.ways)]
+    
+    def _buckets(self, hash_value):
+        mask = self.size - 1
+        return [mix64(hash_value ^ seed) & mask for seed in self.seeds]
+    
+    def hash_function(self, key):
+        return self._buckets(self.hash_func(key) & MASK_64)[0]
+    
+    def display(self):
+        print("Cuckoo Hash Table:")
+        for bucket in range(self.size):
+            start = bucket * self.bucket_size
+            print(bucket, self.slots[start:start + self.bucket_size])
+        print("Stash:", self.stash)
+        
+    def load_factor(self):
+        return self.count / (self.size * self.bucket_size)
+    
+    def _find(self, key, hash_value):
+        slots = self.slots
+        for bucket in self._buckets(hash_value):
+            start = bucket * self.bucket_size
+            for index in range(start, start + self.bucket_size):
+                entry = slots[index]
+                if entry is not None and entry[2] == hash_value and entry[0] == key:
+                    return index
+        return -1
+    
+    def _find_in_stash(self, key):
+        for i, entry in enumerate(self.stash):
+            if entry[0] == key:
+                return i
+        return -1
+    
+    def set(self, key, value):
+        hash_value = self.hash_func(key) & MASK_64
+        entry = (key, value, hash_value)
+        index = self._find(key, hash_value)
+        if index >= 0:
+            self.slots[index] = entry
+            return False
+        index = self._find_in_stash(key)
+        if index >= 0:
+            self.stash[index] = entry
+            return False
+        self.count += 1
+        self.modifications += 1
+        if self.count > self.max_load * self.size * self.bucket_size:
+            self._resize(self.size * 2, [entry])
+        elif not self._insert_entry(entry):
+            self._resize(self.size * 2)
+        return True
+            
+    def get(self, key):
+        hash_value = self.hash_func(key) & MASK_64
+        index = self._find(key, hash_value)
+        if index >= 0:
+            return self.slots[index][1]
+        index = self._find_in_stash(key)
+        if index >= 0:
+            return self.stash[index][1]
+        return None
+    
+    def delete(self, key):
+        hash_value = self.hash_func(key) & MASK_64
+        index = self._find(key, hash_value)
+        if index >= 0:
+            self.slots[index] = None
+        else:
+            index = self._find_in_stash(key)
+            if index < 0:
                 return False
+            del self.stash[index]
+        self.count -= 1
+        self.modifications += 1
+        # A slot was freed: stashed keys may fit in their buckets now
+        for entry in list(self.stash):
+            if self._place_without_kicks(entry):
+                self.stash.remove(entry)
+        return True
+    
+    def probe_length(self, key):
+        hash_value = self.hash_func(key) & MASK_64
+        length = 0
+        for bucket in self._buckets(hash_value):
+            start = bucket * self.bucket_size
+            for index in range(start, start + self.bucket_size):
+                length += 1
+                entry = self.slots[index]
+                if entry is not None and entry[2] == hash_value and entry[0] == key:
+                    return length
+        return length + len(self.stash)
+    
+    # Iteration: the buckets first, then the stash. An insert can kick any key to another bucket,
+    # so like a dict, adding or deleting a key while iterating raises RuntimeError.
+    def items(self):
+        modifications = self.modifications
+        for entries in (self.slots, self.stash):
+            for entry in entries:
+                if self.modifications != modifications:
+                    raise RuntimeError("HashTable changed during iteration")
+                if entry is not None:
+                    yield entry[0], entry[1]
+                    
+    def keys(self):
+        for key, value in self.items():
+            yield key
+            
+    def values(self):
+        for key, value in self.items():
+            yield value
+            
+    def __iter__(self):
+        return self.keys()
+    
+    def _place_without_kicks(self, entry):
+        for bucket in self._buckets(entry[2]):
+            start = bucket * self.bucket_size
+            for index in range(start, start + self.bucket_size):
+                if self.slots[index] is None:
+                    self.slots[index] = entry
+                    return True
         return False
     
-    def rehash(self, old_hash):
-        return (old_hash + 1) % self.size
+    def _insert_entry(self, entry):
+        # Returns False when the entry (or a key it displaced) found no slot and the stash is full
+        for _ in range(self.max_kicks):
+            if self._place_without_kicks(entry):
+                return True
+            bucket = self.random.choice(self._buckets(entry[2]))
+            index = bucket * self.bucket_size + self.random.randrange(self.bucket_size)
+            entry, self.slots[index] = self.slots[index], entry
+        if len(self.stash) < self.stash_size:
+            self.stash.append(entry)
+            return True
+        # Put the homeless entry back in the stash anyway, the caller rebuilds the whole table
+        self.stash.append(entry)
+        return False
+    
+    def _resize(self, new_size, pending=()):
+        old_table = (self.size, self.seeds, self.slots, self.stash)
+        entries = [entry for entry in self.slots if entry is not None] + self.stash + list(pending)
+        for _ in range(MAX_REBUILDS):
+            self.size = new_size
+            self.seeds = self._new_seeds()
+            self.slots = [None] * (new_size * self.bucket_size)
+            self.stash = []
+            if all(self._insert_entry(entry) for entry in entries):
+                return
+            new_size *= 2
+        # Only happens when more than ways * bucket_size + stash_size keys have the same hash_func value
+        # (e.g. anagrams with sum_ascii_hash): new seeds cannot separate them, so keep them in an oversized stash
+        self.size, self.seeds, self.slots, self.stash = old_table
+        self.stash.extend(pending)
+            
+# Time Complexity:
+# - get/delete: O(1) in the worst case (ways * bucket_size slots + the stash)
+# - set: O(1) expected, bounded by max_kicks displacements, plus an O(n) rebuild in the rare case the stash is full
+# - A hash_func that gives many keys the same value breaks the worst-case bound: those keys end up in the stash
+#
+# Tail latency:
+# benchmark_get_latency() times every get() one by one and reports the median (p50), p99 and max latency.
+def benchmark_get_latency(keys=None, hash_func=fnv1a_hash):
+    keys = keys or load_key_corpus()
+    n = len(keys)
+    tables = {
+        "chaining": ChainingHashTable(n // 4, hash_func=hash_func),
+        "open addressing": HashTable(8, hash_func=hash_func),
+        "robin hood": HashTable(8, hash_func=hash_func, probing="robin_hood"),
+        "compact": CompactHashTable(8, hash_func=hash_func),
+        "cuckoo": CuckooHashTable(8, hash_func=hash_func),
+    }
+    print("Keys:", n, "(nanoseconds per get)")
+    for name, hash_table in tables.items():
+        for key in keys:
+            hash_table.set(key, key)
+        latencies = []
+        for key in keys:
+            start = time.perf_counter_ns()
+            hash_table.get(key)
+            latencies.append(time.perf_counter_ns() - start)
+        latencies.sort()
+        print("%-16s p50: %6d   p99: %6d   max: %8d" % (name, latencies[n // 2], latencies[n * 99 // 100], latencies[-1]))
+
+# Example usage
+if __name__ == "__main__":
+    hash_table = CuckooHashTable(seed=1)
+    for i in range(1000):
+        hash_table.set("key%d" % i, i)
+    hash_table.delete("key7")
+    print(hash_table.get("key500"), hash_table.get("key7"), hash_table.count) # Output: 500 None 999
+    benchmark_get_latency(load_key_corpus(limit=5000))
+
+## LRU/TTL cache:
+# A hash table used as a cache grows forever, so a cache needs an eviction policy:
+# - LRU (Least Recently Used): when the cache is full, evict the entry that was used the longest time ago.
+# - TTL (Time To Live): every entry expires ttl seconds after it was put.
+# Building blocks:
+# - A HashTable maps each key to its node in a doubly linked list: O(1) lookup.
+# - The doubly linked list keeps the entries in usage order: the head is the least recently used entry, the tail the most recent.
+#   A get moves the node to the tail, put appends at the tail, eviction removes the head: all O(1) because
+#   the node is known and has a prev link, so unlinking it does not need a walk.
+# The Node and DoublyLinkedList below are the ones from linked-list.py, plus a tail pointer and O(1) remove/move of a known node.
+# (File names with dashes cannot be imported, and importing them would run their examples.)
+# Expiry is lazy plus periodic:
+# - Lazy: get() checks the expiry time of the entry it found and drops it when it is expired.
+# - Periodic: every put/get also checks the next sweep_step entries of the list (a cursor that wraps around),
+#   so expired entries that are never read again are removed too, without a sweep ever walking the whole cache.
+import sys
+
+class Node:
+    def __init__(self, data=None, prev=None, next=None):
+        self.data = data
+        self.prev = prev
+        self.next = next
+        
+class DoublyLinkedList:
+    def __init__(self):
+        self.head = None
+        self.tail = None
+        
+    def insert_at_end(self, data):
+        node = Node(data, self.tail, None)
+        if self.tail:
+            self.tail.next = node
+        else:
+            self.head = node
+        self.tail = node
+        return node
+    
+    def remove(self, node):
+        if node.prev:
+            node.prev.next = node.next
+        else:
+            self.head = node.next
+        if node.next:
+            node.next.prev = node.prev
+        else:
+            self.tail = node.prev
+        node.prev = node.next = None
+        
+    def move_to_end(self, node):
+        if node is self.tail:
+            return
+        self.remove(node)
+        node.prev = self.tail
+        self.tail.next = node
+        self.tail = node
+        
+class LRUCache:
+    def __init__(self, max_entries=None, max_bytes=None, ttl=None, sweep_step=16, sizeof=sys.getsizeof, clock=time.monotonic,
+                 hash_func=sum_ascii_hash):
+        self.table = HashTable(8, hash_func=hash_func)
+        self.order = DoublyLinkedList()
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sweep_step = sweep_step
+        self.sizeof = sizeof
+        self.clock = clock
+        self.bytes = 0
+        self.cursor = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        
+    @property
+    def count(self):
+        return self.table.count
+    
+    def get(self, key):
+        self.expire()
+        node = self.table.get(key)
+        if node is None:
+            self.misses += 1
+            return None
+        key, value, expires_at, size = node.data
+        if expires_at is not None and expires_at <= self.clock():
+            self._remove(node)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self.order.move_to_end(node)
+        self.hits += 1
+        return value
+    
+    def put(self, key, value, ttl=None):
+        self.expire()
+        ttl = ttl if ttl is not None else self.ttl
+        expires_at = self.clock() + ttl if ttl is not None else None
+        size = self.sizeof(key) + self.sizeof(value)
+        node = self.table.get(key)
+        if node is None:
+            node = self.order.insert_at_end((key, value, expires_at, size))
+            self.table.set(key, node)
+        else:
+            self.bytes -= node.data[3]
+            node.data = (key, value, expires_at, size)
+            self.order.move_to_end(node)
+        self.bytes += size
+        self._evict()
+        
+    def delete(self, key):
+        node = self.table.get(key)
+        if node is None:
+            return False
+        self._remove(node)
+        return True
+    
+    def expire(self):
+        # Periodic expiry: check the next sweep_step entries only
+        now = self.clock()
+        node = self.cursor or self.order.head
+        for _ in range(min(self.sweep_step, self.count)):
+            next_node = node.next or self.order.head
+            expires_at = node.data[2]
+            if expires_at is not None and expires_at <= now:
+                self._remove(node)
+                self.expirations += 1
+                if self.order.head is None:
+                    break
+            node = next_node
+        self.cursor = node if self.order.head is not None else None
+        
+    def stats(self):
+        return {
+            "entries": self.count,
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+    
+    def _evict(self):
+        while self.order.head is not None and (
+            (self.max_entries is not None and self.count > self.max_entries)
+            or (self.max_bytes is not None and self.bytes > self.max_bytes)
+        ):
+            self._remove(self.order.head)
+            self.evictions += 1
+            
+    def _remove(self, node):
+        if node is self.cursor:
+            self.cursor = node.next
+        self.order.remove(node)
+        self.table.delete(node.data[0])
+        self.bytes -= node.data[3]
+        
+# Time Complexity:
+# - get/put/delete: O(1) + O(sweep_step) for the periodic expiry
+# - Memory: bounded by max_entries and max_bytes (sizeof(key) + sizeof(value) per entry, sys.getsizeof by default)
+
+# Example usage
+if __name__ == "__main__":
+    cache = LRUCache(max_entries=2)
+    cache.put("John", 23)
+    cache.put("Jane", 25)
+    cache.get("John")
+    cache.put("Jack", 27) # Evicts "Jane", the least recently used key
+    print(cache.get("Jane"), cache.get("John"), cache.get("Jack")) # Output: None 23 27
+    cache = LRUCache(ttl=0.01)
+    cache.put("John", 23)
+    time.sleep(0.02)
+    print(cache.get("John"), cache.stats()) # Output: None {... 'expirations': 1}
+
+## Bloom filter in front of a hash table:
+# When most lookups are for keys that are not in the table, every miss still hashes the key and walks a chain
+# or a probe sequence to the end. A Bloom filter answers "definitely not in the table" much faster:
+# - It is an array of m bits and k hash functions. add(key) sets the k bits of the key.
+# - A key whose k bits are not all set was never added: definitely absent, the table is not touched.
+# - A key whose k bits are all set is probably present (false positive rate p), so we ask the table.
+# Sizing from the expected number of keys n and the target false positive rate p:
+#   m = -n * ln(p) / ln(2)^2 bits, k = m / n * ln(2) hash functions (1% -> ~9.6 bits and 7 hash functions per key)
+# A plain Bloom filter cannot forget a key, so this is a counting Bloom filter: a small counter (one byte) instead of a bit.
+# add increments the k counters and remove decrements them; a counter that reached 255 stays there (it might be shared).
+# The k positions come from one 64-bit hash split in two halves: position_i = h1 + i * h2 (Kirsch-Mitzenmacher double hashing).
+# Correctness: the filter stores keys, not slots, so a resize of the table does not affect it,
+# and every live key keeps all its counters above 0, so the filter never says "absent" for a key in the table.
+# When the table holds twice the expected number of keys the false positive rate climbs,
+# so the filter is rebuilt twice as big from the table's keys (then swapped in, readers never see a half-built filter).
+# Every table's set() returns True when the key is new, so a key is added to the filter exactly once,
+# even when its value is None. The filter hashes the keys as bytes (key_to_bytes): DiskHashTable.items()
+# gives the keys back as memoryviews of their bytes, not as the str the caller passed.
+# Threads: set/delete hold the wrapper's lock around the table write and the counter updates (a lost increment would
+# let a later remove zero a counter that a live key still needs), get reads the filter without it.
+# The wrapper is as thread-safe as the table it wraps: put it in front of a LockedHashTable or a ShardedHashTable to share it.
+import math
+
+class CountingBloomFilter:
+    def __init__(self, expected_keys=1024, false_positive_rate=0.01, hash_func=None):
+        self.expected_keys = expected_keys
+        self.false_positive_rate = false_positive_rate
+        self.hash_func = hash_func or make_seeded_hash()
+        self.size = max(8, math.ceil(-expected_keys * math.log(false_positive_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / expected_keys * math.log(2)))
+        self.counters = bytearray(self.size)
+        
+    def _positions(self, key):
+        hash_value = self.hash_func(key) & MASK_64
+        h1 = hash_value & 0xFFFFFFFF
+        h2 = (hash_value >> 32) | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+    
+    def add(self, key):
+        counters = self.counters
+        for position in self._positions(key):
+            if counters[position] < 255:
+                counters[position] += 1
+                
+    def remove(self, key):
+        counters = self.counters
+        for position in self._positions(key):
+            if 0 < counters[position] < 255:
+                counters[position] -= 1
+                
+    def might_contain(self, key):
+        # Same positions as _positions, computed one at a time so a miss stops at the first empty counter
+        hash_value = self.hash_func(key) & MASK_64
+        h1 = hash_value & 0xFFFFFFFF
+        h2 = (hash_value >> 32) | 1
+        counters = self.counters
+        size = self.size
+        for i in range(self.hash_count):
+            if counters[(h1 + i * h2) % size] == 0:
+                return False
+        return True
+    
+    def __contains__(self, key):
+        return self.might_contain(key)
+    
+class BloomFilteredHashTable:
+    def __init__(self, hash_table, expected_keys=1024, false_positive_rate=0.01):
+        self.table = hash_table
+        self.filter = CountingBloomFilter(expected_keys, false_positive_rate)
+        self.lock = threading.Lock()
+        self.keys_in_filter = 0
+        self.filtered = 0
+        self.false_positives = 0
+        
+    def set(self, key, value):
+        with self.lock:
+            is_new = self.table.set(key, value)
+            if is_new:
+                self.filter.add(key_to_bytes(key))
+                self.keys_in_filter += 1
+            if self.keys_in_filter > 2 * self.filter.expected_keys and hasattr(self.table, "items"):
+                self._rebuild_filter(2 * self.keys_in_filter)
+            return is_new
+        
+    def get(self, key):
+        if not self.filter.might_contain(key_to_bytes(key)):
+            self.filtered += 1
+            return None
+        value = self.table.get(key)
+        if value is None:
+            self.false_positives += 1
+        return value
+    
+    def delete(self, key):
+        key_bytes = key_to_bytes(key)
+        if not self.filter.might_contain(key_bytes):
+            self.filtered += 1
+            return False
+        with self.lock:
+            if self.table.delete(key):
+                self.filter.remove(key_bytes)
+                self.keys_in_filter -= 1
+                return True
+            return False
+        
+    def _rebuild_filter(self, expected_keys):
+        bloom_filter = CountingBloomFilter(expected_keys, self.filter.false_positive_rate)
+        keys_in_filter = 0
+        for key, value in self.table.items():
+            bloom_filter.add(bytes(key) if isinstance(key, memoryview) else key_to_bytes(key))
+            keys_in_filter += 1
+        self.filter = bloom_filter
+        self.keys_in_filter = keys_in_filter
+        
+    def load_factor(self):
+        return self.table.load_factor()
+    
+    def probe_length(self, key):
+        return self.table.probe_length(key) if self.filter.might_contain(key_to_bytes(key)) else 0
+    
+    def display(self):
+        self.table.display()
+        
+    def items(self):
+        return self.table.items()
+    
+    def __iter__(self):
+        return iter(self.table)
+    
+# Time Complexity:
+# - get/delete of an absent key: O(k) with probability 1 - p, without touching the table
+# - Memory: about 1.44 * log2(1/p) counters per key (one byte each)
+
+# Example usage
+if __name__ == "__main__":
+    def time_misses(hash_table, keys):
+        start = time.perf_counter()
+        for key in keys:
+            hash_table.get(key)
+        return (time.perf_counter() - start) / len(keys) * 1e6
+    
+    hash_table = HashTable(8, hash_func=fnv1a_hash)
+    filtered_table = BloomFilteredHashTable(HashTable(8, hash_func=fnv1a_hash), expected_keys=10000)
+    for i in range(10000):
+        hash_table.set("key%d" % i, i)
+        filtered_table.set("key%d" % i, i)
+    misses = ["miss%d" % i for i in range(10000)]
+    print("Miss latency: %.2f microseconds without filter, %.2f with filter, %d false positives"
+          % (time_misses(hash_table, misses), time_misses(filtered_table, misses), filtered_table.false_positives))
+
+## Consistent hashing across processes:
+# One HashTable lives in one interpreter and uses one core. To use more cores (or machines),
+# split the keys across shards that live in separate worker processes.
+# Why not shard = hash(key) % N? Adding or removing a shard changes N, and then almost every key moves to another shard.
+# Consistent hashing:
+# - Every shard is placed on a ring of 2^64 points, at the hash of its name.
+# - A key belongs to the first shard point at or after the hash of the key (going clockwise around the ring).
+# - Adding a shard only takes over the keys between its point and the previous point: about 1/N of the keys move.
+# - Virtual nodes: each shard is placed at `vnodes` points (hash of "name#0", "name#1", ...), so every shard owns
+#   many small arcs instead of one big one: the keys spread evenly and a new shard takes keys from all the other shards.
+# The ring hash must give the same result in every process, so it is FNV-1a (mixed with splitmix64), not the seeded built-in hash.
+# Each worker process keeps a CompactHashTable and serves commands over a multiprocessing Pipe (a Unix socket pair on Linux).
+# Batch calls (set_many/get_many) send one message to every shard before waiting for any reply, so the shards work in parallel.
+# Rebalancing after add_shard: every old shard gets the new ring and sends back only the keys that it does not own anymore.
+import bisect
+import multiprocessing
+
+def ring_hash(key):
+    return mix64(fnv1a_hash(key))
+
+def ring_owner(points, owners, hash_value):
+    # First point at or after the hash value, wrapping around to the first point of the ring
+    return owners[bisect.bisect_left(points, hash_value) % len(points)]
+
+class ConsistentHashRing:
+    def __init__(self, vnodes=100):
+        self.vnodes = vnodes
+        self.points = []
+        self.owners = []
+        
+    def add_node(self, name):
+        for i in range(self.vnodes):
+            point = ring_hash("%s#%d" % (name, i))
+            index = bisect.bisect_left(self.points, point)
+            self.points.insert(index, point)
+            self.owners.insert(index, name)
+            
+    def remove_node(self, name):
+        kept = [(point, owner) for point, owner in zip(self.points, self.owners) if owner != name]
+        self.points = [point for point, owner in kept]
+        self.owners = [owner for point, owner in kept]
+        
+    def node_for(self, key):
+        return ring_owner(self.points, self.owners, ring_hash(key))
+    
+def shard_worker(connection):
+    hash_table = CompactHashTable(hash_func=fnv1a_hash)
+    while True:
+        command, *args = connection.recv()
+        result = None
+        if command == "set":
+            result = hash_table.set(*args)
+        elif command == "get":
+            result = hash_table.get(args[0])
+        elif command == "delete":
+            result = hash_table.delete(args[0])
+        elif command == "set_many":
+            for key, value in args[0]:
+                hash_table.set(key, value)
+        elif command == "get_many":
+            result = [hash_table.get(key) for key in args[0]]
+        elif command == "extract":
+            # Hand over the keys that belong to another shard on the new ring
+            points, owners, name = args
+            result = [(key, value) for key, value in hash_table.items() if ring_owner(points, owners, ring_hash(key)) != name]
+            for key, value in result:
+                hash_table.delete(key)
+        elif command == "items":
+            result = list(hash_table.items())
+        elif command == "count":
+            result = hash_table.count
+        elif command == "stop":
+            connection.send(None)
+            break
+        connection.send(result)
+        
+class ShardProcess:
+    def __init__(self, name):
+        self.name = name
+        self.connection, worker_connection = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=shard_worker, args=(worker_connection,), daemon=True)
+        self.process.start()
+        
+    def send(self, *command):
+        self.connection.send(command)
+        
+    def receive(self):
+        return self.connection.recv()
+    
+    def call(self, *command):
+        self.send(*command)
+        return self.receive()
+    
+    def stop(self):
+        self.call("stop")
+        self.process.join()
+        
+class DistributedHashTable:
+    def __init__(self, shards=4, vnodes=100):
+        self.ring = ConsistentHashRing(vnodes)
+        self.shards = {}
+        self.next_shard = 0
+        for _ in range(shards):
+            self.add_shard()
+            
+    def _shard(self, key):
+        return self.shards[self.ring.node_for(key)]
+    
+    def set(self, key, value):
+        return self._shard(key).call("set", key, value)
+        
+    def get(self, key):
+        return self._shard(key).call("get", key)
+    
+    def delete(self, key):
+        return self._shard(key).call("delete", key)
+    
+    def _group_by_shard(self, keys):
+        groups = {}
+        for position, key in enumerate(keys):
+            groups.setdefault(self.ring.node_for(key), []).append(position)
+        return groups
+    
+    def set_many(self, items):
+        for batch in batches(items):
+            groups = self._group_by_shard([key for key, value in batch])
+            for name, positions in groups.items():
+                self.shards[name].send("set_many", [batch[position] for position in positions])
+            for name in groups:
+                self.shards[name].receive()
+                
+    def get_many(self, keys):
+        keys = list(keys)
+        results = [None] * len(keys)
+        groups = self._group_by_shard(keys)
+        for name, positions in groups.items():
+            self.shards[name].send("get_many", [keys[position] for position in positions])
+        for name, positions in groups.items():
+            for position, value in zip(positions, self.shards[name].receive()):
+                results[position] = value
+        return results
+    
+    def count(self):
+        return sum(shard.call("count") for shard in self.shards.values())
+    
+    def add_shard(self):
+        # Returns the number of keys that moved to the new shard
+        name = "shard%d" % self.next_shard
+        self.next_shard += 1
+        old_shards = list(self.shards.values())
+        self.shards[name] = ShardProcess(name)
+        self.ring.add_node(name)
+        for shard in old_shards:
+            shard.send("extract", self.ring.points, self.ring.owners, shard.name)
+        moved = []
+        for shard in old_shards:
+            moved += shard.receive()
+        self.set_many(moved)
+        return len(moved)
+    
+    def remove_shard(self, name):
+        # Returns the number of keys that moved to the other shards
+        shard = self.shards.pop(name)
+        self.ring.remove_node(name)
+        moved = shard.call("items")
+        shard.stop()
+        self.set_many(moved)
+        return len(moved)
+    
+    def close(self):
+        for shard in self.shards.values():
+            shard.stop()
+        self.shards = {}
+        
+# Test harness: load the keys, check them, add a shard and remove one, checking that every key is still there
+# and that only about 1/N of the keys moved. Reports the aggregate throughput and the rebalance cost.
+def benchmark_distributed(shards=4, keys=50000, vnodes=100):
+    items = [("key%d" % i, i) for i in range(keys)]
+    key_names = [key for key, value in items]
+    table = DistributedHashTable(shards, vnodes)
+    try:
+        start = time.perf_counter()
+        table.set_many(items)
+        print("set_many: %.0f keys/sec over %d processes" % (keys / (time.perf_counter() - start), shards))
+        start = time.perf_counter()
+        values = table.get_many(key_names)
+        print("get_many: %.0f keys/sec" % (keys / (time.perf_counter() - start)))
+        if values != [value for key, value in items]:
+            raise AssertionError("lost keys before rebalancing")
+        start = time.perf_counter()
+        moved = table.add_shard()
+        print("add shard: moved %d keys (%.1f%%, ideal %.1f%%) in %.3f seconds"
+              % (moved, 100 * moved / keys, 100 / (shards + 1), time.perf_counter() - start))
+        start = time.perf_counter()
+        moved = table.remove_shard("shard0")
+        print("remove shard: moved %d keys (%.1f%%) in %.3f seconds" % (moved, 100 * moved / keys, time.perf_counter() - start))
+        if table.get_many(key_names) != [value for key, value in items] or table.count() != keys:
+            raise AssertionError("lost keys after rebalancing")
+        print("All keys found after rebalancing")
+    finally:
+        table.close()
+
+# Example usage
+if __name__ == "__main__":
+    benchmark_distributed(shards=4, keys=20000)
+
+## Iteration and snapshots:
+# Every table has items(), keys(), values() and `for key in hash_table`. They are generators: nothing is copied into a list,
+# walking a table of 10^7 keys uses O(1) extra memory. Like a dict, changing the table while iterating raises
+# RuntimeError("HashTable changed during iteration") instead of silently skipping or repeating keys:
+# every table counts its modifications (inserting a new key, deleting a key, resizing) and the iterator checks
+# the counter before every step. Updating the value of an existing key is allowed, as with a dict.
+#
+# Snapshots: dump_hash_table() writes an Open Addressing table to a binary file and load_hash_table() reads it back.
+# Replaying set() for every key calls the hash function and walks a probe sequence n times, and resizes on the way.
+# The dump keeps the layout instead: the slot index and the cached hash of every entry, and the tombstones
+# (a linear probe chain is only valid with them), so loading puts every entry straight back in its slot.
+# - Header: magic, format version, table size, count and number of tombstones (struct, little-endian)
+# - Body: probing policy, hash fingerprint, slot indices and tombstones (array("q") -> raw 8-byte integers),
+#   then the keys, values and hashes lists, written with pickle (protocol 5 stores ints and strings compactly).
+# The hash function itself is not saved (it is code), so load_hash_table() must be given the same one.
+# The fingerprint (hash_func of a fixed string) catches the most common mistake: a different or randomly seeded hash.
+# pickle can run code while loading: only load files you wrote yourself.
+import pickle
+
+DUMP_MAGIC = b"HTDP"
+DUMP_VERSION = 1
+DUMP_HEADER = struct.Struct("<4sIQQQ")
+DUMP_FINGERPRINT_KEY = "HashTable dump fingerprint"
+
+def dump_hash_table(hash_table, path):
+    hash_table._finish_rehash()
+    indices, tombstones = array("q"), array("q")
+    keys, values, hashes = [], [], []
+    for index, entry in enumerate(hash_table.hash_table):
+        if entry is TOMBSTONE:
+            tombstones.append(index)
+        elif entry is not None:
+            indices.append(index)
+            keys.append(entry[0])
+            values.append(entry[1])
+            hashes.append(entry[2])
+    with open(path, "wb") as file:
+        file.write(DUMP_HEADER.pack(DUMP_MAGIC, DUMP_VERSION, hash_table.size, hash_table.count, len(tombstones)))
+        fingerprint = hash_table.hash_func(DUMP_FINGERPRINT_KEY)
+        pickle.dump((hash_table.probing, fingerprint, indices, tombstones, keys, values, hashes), file, protocol=5)
+        
+def load_hash_table(path, hash_func=sum_ascii_hash, **table_options):
+    with open(path, "rb") as file:
+        magic, version, size, count, tombstone_count = DUMP_HEADER.unpack(file.read(DUMP_HEADER.size))
+        if magic != DUMP_MAGIC or version != DUMP_VERSION:
+            raise ValueError("%s is not a HashTable dump" % path)
+        probing, fingerprint, indices, tombstones, keys, values, hashes = pickle.load(file)
+    if hash_func(DUMP_FINGERPRINT_KEY) != fingerprint:
+        raise ValueError("%s was dumped with a different hash function" % path)
+    if len(indices) != count or len(tombstones) != tombstone_count:
+        raise ValueError("%s is truncated or corrupted" % path)
+    hash_table = HashTable(hash_func=hash_func, probing=probing, **table_options)
+    slots = [None] * size
+    for index, entry in zip(indices, zip(keys, values, hashes)):
+        slots[index] = entry
+    for index in tombstones:
+        slots[index] = TOMBSTONE
+    hash_table.size = size
+    hash_table.hash_table = slots
+    hash_table.count = count
+    hash_table.tombstones = tombstone_count
+    return hash_table
+
+# Time Complexity:
+# - items()/keys()/values(): O(1) per step, O(size) for a full walk (empty slots and tombstones are skipped)
+# - dump/load: O(size), load never calls the hash function and never probes
+#
+# benchmark_dump_load() compares load_hash_table() with replaying set() and set_many() into an empty table.
+def benchmark_dump_load(n=100000, hash_func=None):
+    import tempfile
+    hash_func = hash_func or make_seeded_hash(42)
+    items = [("key%d" % i, i) for i in range(n)]
+    hash_table = HashTable(8, hash_func=hash_func)
+    hash_table.set_many(iter(items))
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "table.dump")
+        start = time.perf_counter()
+        dump_hash_table(hash_table, path)
+        dump_time = time.perf_counter() - start
+        print("dump: %.3f seconds, %.1f bytes per key" % (dump_time, os.path.getsize(path) / n))
+        start = time.perf_counter()
+        loaded = load_hash_table(path, hash_func=hash_func)
+        load_time = time.perf_counter() - start
+    start = time.perf_counter()
+    replayed = HashTable(8, hash_func=hash_func)
+    for key, value in items:
+        replayed.set(key, value)
+    set_time = time.perf_counter() - start
+    start = time.perf_counter()
+    HashTable(8, hash_func=hash_func).set_many(iter(items))
+    set_many_time = time.perf_counter() - start
+    print("load: %.3f seconds   set(): %.3f seconds (%.1fx)   set_many(): %.3f seconds (%.1fx)"
+          % (load_time, set_time, set_time / load_time, set_many_time, set_many_time / load_time))
+    if sorted(loaded.items()) != sorted(items) or loaded.get("key%d" % (n // 2)) != n // 2:
+        raise AssertionError("the loaded table does not match the dumped one")
+    
+# Example usage
+if __name__ == "__main__":
+    hash_table = HashTable(8)
+    for name, age in [("John", 23), ("Jane", 25), ("Jack", 27)]:
+        hash_table.set(name, age)
+    print(sorted(hash_table.items())) # Output: [('Jack', 27), ('Jane', 25), ('John', 23)]
+    try:
+        for key in hash_table:
+            hash_table.delete(key)
+    except RuntimeError as error:
+        print(error) # Output: HashTable changed during iteration
+    benchmark_dump_load(20000)
 
 # Hash tables offer fast lookups, insertions, and deletions.
-# Hash tables are widely used in database indexing, caching, routers, and more.
\ No newline at end of file
+# Hash tables are widely used in database indexing, caching, routers, and more.
@@ -28,86 +28,250 @@
 # - Linked List are suitable for large data, so if you have a large number of elements, it's better to use a linked list.
 
 # Implement Linked List:
+# Both lists keep a reference to the last node (tail) and the number of nodes (size) next to the head:
+# - insert_at_end links the new node after tail instead of walking the whole list: O(1) instead of O(n)
+# - get_length/length return size instead of counting the nodes: O(1) instead of O(n)
+# - insert_at/remove_at check the index against size, so they walk the list once instead of twice
+# - insert_values appends every value after tail: O(n) instead of O(n^2)
+# Every method that adds or removes a node has to update tail and size, or they stop matching the chain.
+#
+# Nodes declare __slots__: a normal instance keeps its attributes in its own __dict__ (a hash table of ~100 bytes),
+# with __slots__ the attributes are fixed fields inside the object, so a node is about 3x smaller
+# (and a typo like node.nxt = ... raises AttributeError instead of silently adding an attribute).
+#
+# Both lists support the Python protocols of a sequence: for data in ll, len(ll), repr(ll), ll[i], ll[start:stop:step]
+# (and reversed(dll), following the prev links). Rendering joins the values once: building the output with
+# ll += str(data) copies the whole string on every node, O(n^2) for a long list.
+# write_to(stream) joins chunk_size values at a time, so writing a huge list to a file never builds one giant string.
+import sys
+from itertools import islice
+
 ## Singly Linked List
 class Node:
+    __slots__ = ("data", "next")
+    
     def __init__(self, data=None, next=None):
         self.data = data
         self.next = next
         
+# The Doubly Linked List below defines its own Node, keep a name for this one so LinkedList still builds singly linked nodes
+SinglyNode = Node
+
+# Sorting a linked list in place:
+# Copying the values to a Python list, sorting it and rebuilding the nodes needs O(n) extra memory (and new nodes).
+# Merge sort only needs to relink nodes: merging two sorted chains takes the smaller head each time, O(n + m),
+# and never needs random access, so it suits linked lists better than quicksort or heapsort.
+# Bottom-up merge sort (no recursion, O(1) extra memory): merge runs of 1 node into sorted runs of 2,
+# then runs of 2 into runs of 4, ... log2(n) passes over the list, O(n log n) comparisons.
+# On equal keys the node from the left run goes first, so the sort is stable (like sorted()).
+# key is called on every comparison: caching the keys like sorted() does would need O(n) memory again.
+# The chain helpers only follow next, the Doubly Linked List fixes the prev links afterwards in one pass.
+def identity(data):
+    return data
+
+def split_chain(head, count):
+    # Cuts the chain after count nodes, returns the first node of the rest
+    for _ in range(count - 1):
+        if head is None:
+            return None
+        head = head.next
+    if head is None:
+        return None
+    rest = head.next
+    head.next = None
+    return rest
+
+def merge_chains(left, right, tail, key):
+    # Links the sorted chains left and right after tail, in order, and returns the last node
+    while left and right:
+        if key(right.data) < key(left.data):
+            tail.next = right
+            right = right.next
+        else:
+            tail.next = left
+            left = left.next
+        tail = tail.next
+    tail.next = left or right
+    while tail.next:
+        tail = tail.next
+    return tail
+
+def merge_sort_chain(head, length, key=None):
+    # Returns the new head and tail
+    key = key or identity
+    start = SinglyNode(None, head)
+    tail = head
+    width = 1
+    while width < length:
+        tail = start
+        itr = start.next
+        while itr:
+            left = itr
+            right = split_chain(left, width)
+            itr = split_chain(right, width)
+            tail = merge_chains(left, right, tail, key)
+        width *= 2
+    return start.next, tail
+
 class LinkedList:
     def __init__(self):
         self.head = None
+        self.tail = None
+        self.size = 0
         
     def print(self):
         if self.head is None:
             print("Linked List is empty")
             return
-        itr = self.head
-        ll = ''
-        while itr:
-            ll += str(itr.data) + '-->' if itr.next else str(itr.data)
-            itr = itr.next
-        print(ll)
+        self.write_to(sys.stdout)
+        print()
         
     def get_length(self):
-        count = 0
-        itr = self.head
-        while itr:
-            count += 1
-            itr = itr.next
-        return count
+        return self.size
     
     def insert_at_beginning(self, data):
-        self.head = Node(data, self.head)
+        self.head = SinglyNode(data, self.head)
+        if self.tail is None:
+            self.tail = self.head
+        self.size += 1
         
     def insert_at_end(self, data):
+        node = SinglyNode(data, None)
         if self.head is None:
-            self.head = Node(data, None)
-            return
-        itr = self.head
-        while itr.next:
-            itr = itr.next
-        itr.next = Node(data, None)
+            self.head = node
+        else:
+            self.tail.next = node
+        self.tail = node
+        self.size += 1
         
     def insert_at(self, index, data):
-        if index < 0 or index > self.get_length():
+        if index < 0 or index > self.size:
             raise Exception("Invalid index")
         
         if index == 0:
             self.insert_at_beginning(data)
             return
+        
+        if index == self.size:
+            self.insert_at_end(data)
+            return
 
         count = 0
         itr = self.head
         while itr:
             if count == index - 1:
-                itr.next = Node(data, itr.next)
+                itr.next = SinglyNode(data, itr.next)
+                self.size += 1
                 break
             itr = itr.next
             count += 1
             
     def remove_at(self, index):
-        if index < 0 or index >= self.get_length():
+        if index < 0 or index >= self.size:
             raise Exception("Invalid index")
         
         if index == 0:
             self.head = self.head.next
+            if self.head is None:
+                self.tail = None
+            self.size -= 1
             return
         
         count = 0
         itr = self.head
         while itr:
             if count == index - 1:
+                if itr.next is self.tail:
+                    self.tail = itr
                 itr.next = itr.next.next
+                self.size -= 1
                 break
             itr = itr.next
             count +=1
             
     def insert_values(self, data_list):
         self.head = None
+        self.tail = None
+        self.size = 0
         for data in data_list:
             self.insert_at_end(data)
             
+    def __iter__(self):
+        itr = self.head
+        while itr:
+            yield itr.data
+            itr = itr.next
+            
+    def __len__(self):
+        return self.size
+    
+    def __repr__(self):
+        return "%s([%s])" % (type(self).__name__, ", ".join(repr(data) for data in self))
+    
+    def _node_at(self, index):
+        if index < 0:
+            index += self.size
+        if index < 0 or index >= self.size:
+            raise IndexError("Invalid index")
+        itr = self.head
+        for _ in range(index):
+            itr = itr.next
+        return itr
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.size)
+            result = type(self)()
+            if step > 0:
+                result.insert_values(islice(self, start, stop, step))
+            else:
+                # A singly linked list can only be walked forward: copy the values to go backward
+                result.insert_values(list(self)[index])
+            return result
+        return self._node_at(index).data
+    
+    def write_to(self, stream, separator='-->', chunk_size=1024):
+        values = iter(self)
+        chunk = [str(data) for data in islice(values, chunk_size)]
+        while chunk:
+            stream.write(separator.join(chunk))
+            chunk = [str(data) for data in islice(values, chunk_size)]
+            if chunk:
+                stream.write(separator)
+                
+    def sort(self, key=None):
+        self.head, self.tail = merge_sort_chain(self.head, self.size, key)
+        
+    def insert_sorted(self, data, key=None):
+        # Inserts after the last value that is not greater, so the list stays sorted and stable
+        key = key or identity
+        if self.tail is not None and not key(data) < key(self.tail.data):
+            self.insert_at_end(data)
+            return
+        
+        if self.head is None or key(data) < key(self.head.data):
+            self.insert_at_beginning(data)
+            return
+        
+        itr = self.head
+        while not key(data) < key(itr.next.data):
+            itr = itr.next
+        itr.next = SinglyNode(data, itr.next)
+        self.size += 1
+        
+    def merge(self, other, key=None):
+        # Merges the sorted list other into this sorted list in O(n + m), other is left empty
+        if other is self:
+            raise ValueError("Cannot merge a list with itself")
+        start = SinglyNode()
+        tail = merge_chains(self.head, other.head, start, key or identity)
+        self.head = start.next
+        self.tail = tail if self.head else None
+        self.size += other.size
+        other.head = None
+        other.tail = None
+        other.size = 0
+        
                                     
 ll = LinkedList()
 ll.insert_at_beginning(5)
@@ -122,6 +286,8 @@ print('Length: ', ll.get_length())
 
 ## Doubly Linked List
 class Node:
+    __slots__ = ("data", "prev", "next")
+    
     def __init__(self, data=None, prev=None, next=None):
         self.data = data
         self.prev = prev
@@ -130,90 +296,356 @@ class Node:
 class DoublyLinkedList:
     def __init__(self):
         self.head = None
+        self.tail = None
+        self.size = 0
+        # Bumped by every insert and remove, so a Cursor can tell the list changed under it
+        self.modifications = 0
         
     def print(self):
         if self.head is None:
             print("Linked List is empty")
             return
         
-        itr = self.head
-        ll = ''
-        while itr:
-            ll += str(itr.data) + '<-->' if itr.next else str(itr.data)
-            itr = itr.next
-            
-        print(ll)
+        self.write_to(sys.stdout)
+        print()
         
     def length(self):
-        count = 0
-        itr = self.head
-        while itr:
-            count += 1
-            itr = itr.next
-            
-        return count
+        return self.size
     
     def insert_at_beginning(self, data):
         node = Node(data, None, self.head)
         self.head = node
         if node.next:
             node.next.prev = node
+        else:
+            self.tail = node
+        self.size += 1
+        self.modifications += 1
+        return node
             
     def insert_at_end(self, data):
+        node = Node(data, self.tail, None)
         if self.head is None:
-            self.head = Node(data, None, None)
-            return
-        
-        itr = self.head
-        while itr.next:
-            itr = itr.next
-        itr.next = Node(data, itr, None)
+            self.head = node
+        else:
+            self.tail.next = node
+        self.tail = node
+        self.size += 1
+        self.modifications += 1
+        return node
         
     def insert_at(self, index, data):
-        if index < 0 or index > self.length():
+        if index < 0 or index > self.size:
             raise Exception("Invalid index")
         
         if index == 0:
-            self.insert_at_beginning(data)
-            return
+            return self.insert_at_beginning(data)
         
-        count = 0
-        itr = self.head
-        while itr:
-            if count == index - 1:
-                node = Node(data, itr, itr.next)
-                if node.next:
-                    node.next.prev = node
-                itr.next = node
-                break
-            itr = itr.next
-            count += 1
+        if index == self.size:
+            return self.insert_at_end(data)
+        
+        return self._insert_before(self.node_at(index), data)
         
     def remove_at(self, index):
-        if index < 0 or index >= self.length():
+        if index < 0 or index >= self.size:
             raise Exception("Invalid index")
         
-        if index == 0:
-            self.head = self.head.next
-            self.head.prev = None
-            return
+        self._unlink(self.node_at(index))
         
-        count = 0
+    def _insert_before(self, next, data):
+        if next.prev is None:
+            return self.insert_at_beginning(data)
+        node = Node(data, next.prev, next)
+        next.prev.next = node
+        next.prev = node
+        self.size += 1
+        self.modifications += 1
+        return node
+    
+    def _unlink(self, node):
+        if node.prev is None:
+            self.head = node.next
+        else:
+            node.prev.next = node.next
+        if node.next is None:
+            self.tail = node.prev
+        else:
+            node.next.prev = node.prev
+        node.prev = None
+        node.next = None
+        self.size -= 1
+        self.modifications += 1
+        
+    def cursor(self, index=0):
+        # A Cursor at index (index == length() is just past the last node)
+        if index < 0 or index > self.size:
+            raise Exception("Invalid index")
+        
+        return Cursor(self, None if index == self.size else self.node_at(index), index)
+    
+    
+    def insert_values(self, data_list):
+        self.head = None
+        self.tail = None
+        self.size = 0
+        self.modifications += 1
+        for data in data_list:
+            self.insert_at_end(data)
+            
+    def __iter__(self):
         itr = self.head
         while itr:
-            if count == index - 1:
-                itr.next = itr.next.next
-                if itr.next:
-                    itr.next.prev = itr
-                break
+            yield itr.data
             itr = itr.next
-            count +=1
             
-    def insert_values(self, data_list):
-        self.head = None
-        for data in data_list:
+    def __reversed__(self):
+        itr = self.tail
+        while itr:
+            yield itr.data
+            itr = itr.prev
+            
+    def __len__(self):
+        return self.size
+    
+    def __repr__(self):
+        return "%s([%s])" % (type(self).__name__, ", ".join(repr(data) for data in self))
+    
+    def node_at(self, index):
+        if index < 0:
+            index += self.size
+        if index < 0 or index >= self.size:
+            raise IndexError("Invalid index")
+        # Walk from the nearer end: at most size / 2 steps
+        if index <= self.size // 2:
+            itr = self.head
+            for _ in range(index):
+                itr = itr.next
+        else:
+            itr = self.tail
+            for _ in range(self.size - 1 - index):
+                itr = itr.prev
+        return itr
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.size)
+            result = type(self)()
+            if step > 0:
+                result.insert_values(islice(self, start, stop, step))
+            else:
+                # Walk backward from tail: position p is at index size - 1 - p of reversed(self)
+                last = self.size - 1
+                result.insert_values(islice(reversed(self), last - start, max(last - stop, 0), -step))
+            return result
+        return self.node_at(index).data
+    
+    def write_to(self, stream, separator='<-->', chunk_size=1024):
+        values = iter(self)
+        chunk = [str(data) for data in islice(values, chunk_size)]
+        while chunk:
+            stream.write(separator.join(chunk))
+            chunk = [str(data) for data in islice(values, chunk_size)]
+            if chunk:
+                stream.write(separator)
+                
+    # Moving whole chains between lists:
+    # a doubly linked list knows both of its ends, so a whole list can be linked in or cut out by changing
+    # the 4 pointers at the boundaries, whatever its length. The nodes are moved, not copied:
+    # the list they come from is left empty (a node can only be in one list).
+    # The insert methods return the new node so it can be used as a splice point later.
+    def splice(self, other, at_node=None):
+        # Moves all the nodes of other right after at_node (a node of this list, None = before head): O(1)
+        if other is self:
+            raise ValueError("Cannot splice a list into itself")
+        if other.head is None:
+            return
+        first, last = other.head, other.tail
+        next = self.head if at_node is None else at_node.next
+        first.prev = at_node
+        last.next = next
+        if at_node is None:
+            self.head = first
+        else:
+            at_node.next = first
+        if next is None:
+            self.tail = last
+        else:
+            next.prev = last
+        self.size += other.size
+        self.modifications += 1
+        other.head = None
+        other.tail = None
+        other.size = 0
+        other.modifications += 1
+        
+    def extend(self, values):
+        # Another DoublyLinkedList is moved to the end in O(1), any other iterable is appended value by value
+        if isinstance(values, DoublyLinkedList):
+            self.splice(values, self.tail)
+            return
+        for data in values:
             self.insert_at_end(data)
+            
+    def split_at(self, index):
+        # Keeps the first index values, returns a new list with the rest: O(1) once the node at index is found
+        if index < 0 or index > self.size:
+            raise Exception("Invalid index")
+        
+        rest = type(self)()
+        if index == self.size:
+            return rest
+        node = self.node_at(index)
+        rest.head = node
+        rest.tail = self.tail
+        rest.size = self.size - index
+        self.tail = node.prev
+        if self.tail is None:
+            self.head = None
+        else:
+            self.tail.next = None
+        node.prev = None
+        self.size = index
+        self.modifications += 1
+        return rest
+    
+    @classmethod
+    def concat(cls, *lists):
+        # A new list made of the nodes of all the lists, in order: O(number of lists), the lists are left empty
+        result = cls()
+        for ll in lists:
+            result.splice(ll, result.tail)
+        return result
+    
+    def _link_prev(self):
+        # The chain helpers only set next: rebuild the prev links and tail in one pass
+        prev = None
+        itr = self.head
+        while itr:
+            itr.prev = prev
+            prev = itr
+            itr = itr.next
+        self.tail = prev
+        self.modifications += 1
+        
+    def sort(self, key=None):
+        self.head, self.tail = merge_sort_chain(self.head, self.size, key)
+        self._link_prev()
+        
+    def insert_sorted(self, data, key=None):
+        # Walks back from tail to the last value that is not greater: O(1) when the values arrive almost sorted
+        key = key or identity
+        itr = self.tail
+        while itr is not None and key(data) < key(itr.data):
+            itr = itr.prev
+        if itr is None:
+            return self.insert_at_beginning(data)
+        if itr.next is None:
+            return self.insert_at_end(data)
+        return self._insert_before(itr.next, data)
+    
+    def merge(self, other, key=None):
+        # Merges the sorted list other into this sorted list in O(n + m), other is left empty
+        if other is self:
+            raise ValueError("Cannot merge a list with itself")
+        start = Node()
+        merge_chains(self.head, other.head, start, key or identity)
+        self.head = start.next
+        if self.head:
+            self.head.prev = None
+        self._link_prev()
+        self.size += other.size
+        other.head = None
+        other.tail = None
+        other.size = 0
+        other.modifications += 1
+        
+# Cursor (finger):
+# Every indexed operation walks to its index, from the nearer end (at most n / 2 steps).
+# Edits that stay around the same position (a text editor, a sliding window) can keep a finger on a node instead:
+# a Cursor remembers a node and its index, so reading, inserting and removing at the cursor is O(1),
+# and moving it by k positions is O(k) (move_to walks from the cursor, head or tail, whichever is closest).
+# The list counts its modifications: after an edit made through the list or another cursor,
+# the cursor's node and index may be wrong, so using it raises RuntimeError.
+class Cursor:
+    def __init__(self, ll, node, index):
+        self.list = ll
+        self.node = node
+        self.index = index
+        self.modifications = ll.modifications
+        
+    def _check(self):
+        if self.modifications != self.list.modifications:
+            raise RuntimeError("Linked List changed outside this cursor")
+        
+    def _edited(self):
+        self.modifications = self.list.modifications
         
+    def get(self):
+        self._check()
+        if self.node is None:
+            raise IndexError("Cursor is past the end")
+        return self.node.data
+    
+    def set(self, data):
+        self._check()
+        if self.node is None:
+            raise IndexError("Cursor is past the end")
+        self.node.data = data
+        
+    def move_to(self, index):
+        self._check()
+        ll = self.list
+        if index < 0 or index > ll.size:
+            raise IndexError("Invalid index")
+        if index == ll.size:
+            node = None
+        elif self.node is not None and abs(index - self.index) < min(index, ll.size - 1 - index):
+            node = self.node
+            for _ in range(index - self.index):
+                node = node.next
+            for _ in range(self.index - index):
+                node = node.prev
+        else:
+            node = ll.node_at(index)
+        self.node = node
+        self.index = index
+        
+    def move(self, offset=1):
+        self.move_to(self.index + offset)
+        
+    def insert_before(self, data):
+        # The cursor stays on its node, which moves one index up
+        self._check()
+        if self.node is None:
+            node = self.list.insert_at_end(data)
+        else:
+            node = self.list._insert_before(self.node, data)
+        self.index += 1
+        self._edited()
+        return node
+    
+    def insert_after(self, data):
+        self._check()
+        if self.node is None:
+            raise IndexError("Cursor is past the end")
+        if self.node.next is None:
+            node = self.list.insert_at_end(data)
+        else:
+            node = self.list._insert_before(self.node.next, data)
+        self._edited()
+        return node
+    
+    def remove(self):
+        # Removes the node at the cursor, the cursor moves to the next node (same index)
+        self._check()
+        if self.node is None:
+            raise IndexError("Cursor is past the end")
+        node = self.node
+        self.node = node.next
+        self.list._unlink(node)
+        self._edited()
+        return node.data
+    
 dll = DoublyLinkedList()
 dll.insert_at_beginning(5)
 dll.insert_at_beginning(89)
@@ -225,4 +657,699 @@ dll.remove_at(2)
 dll.print()
 print('Length: ', dll.length())
 dll.insert_values([1, 2, 3, 4, 5])
-dll.print()
\ No newline at end of file
+dll.print()
+print(len(dll), list(reversed(dll)), dll[1:4], dll[::-2]) # Output: 5 [5, 4, 3, 2, 1] DoublyLinkedList([2, 3, 4]) DoublyLinkedList([5, 3, 1])
+rest = dll.split_at(2)
+print(dll, rest) # Output: DoublyLinkedList([1, 2]) DoublyLinkedList([3, 4, 5])
+dll.splice(rest, dll.head)
+print(dll, rest) # Output: DoublyLinkedList([1, 3, 4, 5, 2]) DoublyLinkedList([])
+cursor = dll.cursor(2)
+cursor.insert_before(9)
+cursor.move(1)
+print(cursor.remove(), dll) # Output: 5 DoublyLinkedList([1, 3, 9, 4, 2])
+dll.sort(key=lambda data: -data)
+print(dll) # Output: DoublyLinkedList([9, 4, 3, 2, 1])
+
+## Arena (pool) allocation
+# Even with __slots__ every node is a separate Python object: one allocation per insert, one free per remove,
+# and the garbage collector tracks (and walks) every node because it holds references.
+# With tens of millions of nodes that is most of the memory and a lot of the time.
+# An arena preallocates the nodes as parallel arrays instead of objects:
+# - node i is an index: data[i] is its value, next[i] and prev[i] are the indices of its neighbours (NULL = -1)
+# - next and prev are array("q"): 8 bytes per link, plain integers that the garbage collector never looks at
+# - removed nodes go on a free list threaded through next[], so allocate() and release() are O(1) and reuse slots
+# - when the free list is empty the arrays double in size (amortized O(1), like a Python list)
+# Several lists can share one arena (a pool), the nodes of a list are only reachable from its head.
+from array import array
+
+NULL = -1
+
+class NodeArena:
+    def __init__(self, capacity=1024):
+        capacity = max(capacity, 1)
+        self.data = [None] * capacity
+        self.next = array("q", range(1, capacity + 1))
+        self.next[capacity - 1] = NULL
+        self.prev = array("q", [NULL]) * capacity
+        self.free = 0
+        self.used = 0
+        
+    def allocate(self, data, prev=NULL, next=NULL):
+        if self.free == NULL:
+            self._grow()
+        index = self.free
+        self.free = self.next[index]
+        self.data[index] = data
+        self.prev[index] = prev
+        self.next[index] = next
+        self.used += 1
+        return index
+    
+    def release(self, index):
+        # Drop the reference to the value so it can be freed, then push the slot on the free list
+        self.data[index] = None
+        self.next[index] = self.free
+        self.free = index
+        self.used -= 1
+        
+    def _grow(self):
+        capacity = len(self.data)
+        self.data.extend([None] * capacity)
+        self.next.extend(range(capacity + 1, 2 * capacity + 1))
+        self.next[2 * capacity - 1] = NULL
+        self.prev.extend(array("q", [NULL]) * capacity)
+        self.free = capacity
+        
+class ArenaDoublyLinkedList:
+    def __init__(self, arena=None, capacity=1024):
+        self.arena = NodeArena(capacity) if arena is None else arena
+        self.head = NULL
+        self.tail = NULL
+        self.size = 0
+        
+    def print(self):
+        if self.head == NULL:
+            print("Linked List is empty")
+            return
+        
+        data, next = self.arena.data, self.arena.next
+        values = []
+        itr = self.head
+        while itr != NULL:
+            values.append(str(data[itr]))
+            itr = next[itr]
+        print('<-->'.join(values))
+        
+    def length(self):
+        return self.size
+    
+    def insert_at_beginning(self, data):
+        node = self.arena.allocate(data, NULL, self.head)
+        if self.head != NULL:
+            self.arena.prev[self.head] = node
+        else:
+            self.tail = node
+        self.head = node
+        self.size += 1
+        
+    def insert_at_end(self, data):
+        node = self.arena.allocate(data, self.tail, NULL)
+        if self.tail != NULL:
+            self.arena.next[self.tail] = node
+        else:
+            self.head = node
+        self.tail = node
+        self.size += 1
+        
+    def _node_at(self, index):
+        next = self.arena.next
+        itr = self.head
+        for _ in range(index):
+            itr = next[itr]
+        return itr
+    
+    def insert_at(self, index, data):
+        if index < 0 or index > self.size:
+            raise Exception("Invalid index")
+        
+        if index == 0:
+            self.insert_at_beginning(data)
+            return
+        
+        if index == self.size:
+            self.insert_at_end(data)
+            return
+        
+        arena = self.arena
+        prev = self._node_at(index - 1)
+        next = arena.next[prev]
+        node = arena.allocate(data, prev, next)
+        arena.next[prev] = node
+        arena.prev[next] = node
+        self.size += 1
+        
+    def remove_at(self, index):
+        if index < 0 or index >= self.size:
+            raise Exception("Invalid index")
+        
+        arena = self.arena
+        node = self.tail if index == self.size - 1 else self._node_at(index)
+        prev, next = arena.prev[node], arena.next[node]
+        if prev != NULL:
+            arena.next[prev] = next
+        else:
+            self.head = next
+        if next != NULL:
+            arena.prev[next] = prev
+        else:
+            self.tail = prev
+        arena.release(node)
+        self.size -= 1
+        
+    def clear(self):
+        # Give every node back to the arena, other lists sharing it can reuse the slots
+        arena = self.arena
+        itr = self.head
+        while itr != NULL:
+            next = arena.next[itr]
+            arena.release(itr)
+            itr = next
+        self.head = NULL
+        self.tail = NULL
+        self.size = 0
+        
+    def insert_values(self, data_list):
+        self.clear()
+        for data in data_list:
+            self.insert_at_end(data)
+            
+adll = ArenaDoublyLinkedList(capacity=4)
+adll.insert_at_beginning(5)
+adll.insert_at_beginning(89)
+adll.insert_at_end(79)
+adll.insert_at_end(45)
+adll.insert_at(2, 78)
+adll.insert_at(0, 56)
+adll.remove_at(2)
+adll.print()
+print('Length: ', adll.length())
+
+## Unrolled Linked List
+# A linked list is not cache-friendly: every value is in its own node somewhere in memory, and reaching the k-th
+# value means following k pointers. An unrolled linked list stores a small array of values in every node:
+# - a node holds between capacity / 2 and capacity values (only the last node can hold fewer)
+# - walking to an index skips a whole node at a time: O(n / capacity) steps instead of O(n),
+#   with capacity around sqrt(n) that is O(sqrt(n)), and inserting or removing inside a node moves O(capacity) values
+# - one node (and one pointer) per capacity / 2 values or more: much less memory per value than one node per value
+# - insert into a full node: split it in two halves first
+# - remove from a node that drops below half full: merge it with the next node, or borrow values from it
+class UnrolledNode:
+    __slots__ = ("items", "next")
+    
+    def __init__(self, items=None, next=None):
+        self.items = [] if items is None else items
+        self.next = next
+        
+class UnrolledLinkedList:
+    def __init__(self, capacity=64):
+        if capacity < 2:
+            raise ValueError("capacity must be at least 2")
+        self.capacity = capacity
+        self.head = None
+        self.tail = None
+        self.size = 0
+        
+    def print(self):
+        if self.head is None:
+            print("Linked List is empty")
+            return
+        values = []
+        itr = self.head
+        while itr:
+            values.extend(str(data) for data in itr.items)
+            itr = itr.next
+        print('-->'.join(values))
+        
+    def get_length(self):
+        return self.size
+    
+    def insert_at_beginning(self, data):
+        self.insert_at(0, data)
+        
+    def insert_at_end(self, data):
+        if self.tail is None:
+            self.head = self.tail = UnrolledNode([data])
+        elif len(self.tail.items) < self.capacity:
+            self.tail.items.append(data)
+        else:
+            self.tail.next = UnrolledNode([data])
+            self.tail = self.tail.next
+        self.size += 1
+        
+    def insert_at(self, index, data):
+        if index < 0 or index > self.size:
+            raise Exception("Invalid index")
+        
+        if index == self.size:
+            self.insert_at_end(data)
+            return
+        
+        itr = self.head
+        while index >= len(itr.items):
+            index -= len(itr.items)
+            itr = itr.next
+        if len(itr.items) == self.capacity:
+            half = self.capacity // 2
+            itr.next = UnrolledNode(itr.items[half:], itr.next)
+            del itr.items[half:]
+            if self.tail is itr:
+                self.tail = itr.next
+            if index > half:
+                index -= half
+                itr = itr.next
+        itr.items.insert(index, data)
+        self.size += 1
+        
+    def remove_at(self, index):
+        if index < 0 or index >= self.size:
+            raise Exception("Invalid index")
+        
+        prev = None
+        itr = self.head
+        while index >= len(itr.items):
+            index -= len(itr.items)
+            prev = itr
+            itr = itr.next
+        del itr.items[index]
+        self.size -= 1
+        
+        if len(itr.items) >= self.capacity // 2:
+            return
+        nxt = itr.next
+        if nxt is None:
+            # The last node may be less than half full, it only goes away when it is empty
+            if not itr.items:
+                if prev is None:
+                    self.head = None
+                else:
+                    prev.next = None
+                self.tail = prev
+            return
+        if len(itr.items) + len(nxt.items) <= self.capacity:
+            itr.items.extend(nxt.items)
+            itr.next = nxt.next
+            if self.tail is nxt:
+                self.tail = itr
+        else:
+            # The next node is more than half full: move values until both are about the same size
+            count = (len(nxt.items) - len(itr.items)) // 2
+            itr.items.extend(nxt.items[:count])
+            del nxt.items[:count]
+            
+    def insert_values(self, data_list):
+        self.head = None
+        self.tail = None
+        self.size = 0
+        for data in data_list:
+            self.insert_at_end(data)
+            
+ull = UnrolledLinkedList(capacity=2)
+ull.insert_at_beginning(5)
+ull.insert_at_beginning(89)
+ull.insert_at_end(79)
+ull.insert_at_end(45)
+ull.insert_at(2, 78)
+ull.insert_at(0, 56)
+ull.remove_at(2)
+ull.print()
+print('Length: ', ull.get_length())
+
+# Time Complexity (n values, capacity c):
+# - insert_at_end: O(1)
+# - insert_at/remove_at: O(n / c) to find the node + O(c) to shift the values inside it
+# - Memory: a list of c pointers per node instead of a node object per value
+
+## Skip List
+# A sorted linked list keeps its keys in order, but searching it is still a walk from head: O(n).
+# A skip list adds "express lanes" on top of the sorted list:
+# - every node gets a random level: level 1 with probability 1/2, level 2 with 1/4, level 3 with 1/8, ...
+# - a node of level k is linked in the lists of levels 1..k, so level i skips about 2^i nodes at a time
+# - search starts at the highest level of the head and goes right while the next key is smaller, then goes down a level:
+#   about 2 steps per level and log2(n) levels, so search/insert/delete are O(log n) expected
+# - insert and delete only relink the nodes just before the key on every level (update[]), nothing is rebalanced
+# To find a key by its position (select) or the position of a key (rank), every link also stores its width:
+# the number of level 1 steps it jumps over. Going right adds the width to the position.
+# The levels come from random.Random(seed): the same seed and the same inserts always build the same list.
+import random
+
+class SkipNode:
+    __slots__ = ("key", "value", "next", "width")
+    
+    def __init__(self, key=None, value=None, level=1):
+        self.key = key
+        self.value = value
+        self.next = [None] * level
+        self.width = [1] * level
+        
+class SkipList:
+    def __init__(self, max_level=32, p=0.5, seed=None):
+        self.max_level = max_level
+        self.p = p
+        self.random = random.Random(seed)
+        # The head is a sentinel without a key, linked at every level
+        self.head = SkipNode(level=max_level)
+        self.level = 1
+        self.size = 0
+        
+    def print(self):
+        if self.size == 0:
+            print("Skip List is empty")
+            return
+        for i in range(self.level - 1, -1, -1):
+            keys = []
+            itr = self.head.next[i]
+            while itr:
+                keys.append(str(itr.key))
+                itr = itr.next[i]
+            print("Level %d:" % (i + 1), '-->'.join(keys))
+            
+    def get_length(self):
+        return self.size
+    
+    def _random_level(self):
+        level = 1
+        while level < self.max_level and self.random.random() < self.p:
+            level += 1
+        return level
+    
+    def _find(self, key):
+        # update[i]: last node before key on level i, rank[i]: its position (head = 0, first node = 1)
+        update = [self.head] * self.max_level
+        rank = [0] * self.max_level
+        itr = self.head
+        position = 0
+        for i in range(self.level - 1, -1, -1):
+            while itr.next[i] is not None and itr.next[i].key < key:
+                position += itr.width[i]
+                itr = itr.next[i]
+            update[i] = itr
+            rank[i] = position
+        return update, rank
+    
+    def search(self, key):
+        itr = self.head
+        for i in range(self.level - 1, -1, -1):
+            while itr.next[i] is not None and itr.next[i].key < key:
+                itr = itr.next[i]
+        itr = itr.next[0]
+        if itr is not None and itr.key == key:
+            return itr.value
+        return None
+    
+    def insert(self, key, value=None):
+        # Returns False when the key was already there (its value is replaced)
+        update, rank = self._find(key)
+        itr = update[0].next[0]
+        if itr is not None and itr.key == key:
+            itr.value = value
+            return False
+        level = self._random_level()
+        node = SkipNode(key, value, level)
+        for i in range(level):
+            node.next[i] = update[i].next[i]
+            update[i].next[i] = node
+            # update[i] is at rank[i], the new node at rank[0] + 1
+            node.width[i] = update[i].width[i] - (rank[0] - rank[i])
+            update[i].width[i] = rank[0] - rank[i] + 1
+        for i in range(level, self.level):
+            update[i].width[i] += 1
+        self.level = max(self.level, level)
+        self.size += 1
+        return True
+    
+    def delete(self, key):
+        update, rank = self._find(key)
+        node = update[0].next[0]
+        if node is None or node.key != key:
+            return False
+        for i in range(self.level):
+            if update[i].next[i] is node:
+                update[i].width[i] += node.width[i] - 1
+                update[i].next[i] = node.next[i]
+            else:
+                update[i].width[i] -= 1
+        while self.level > 1 and self.head.next[self.level - 1] is None:
+            self.level -= 1
+        self.size -= 1
+        return True
+    
+    def rank(self, key):
+        # Number of keys smaller than key: the index of key if it is in the list, where it would go otherwise
+        update, rank = self._find(key)
+        return rank[0]
+    
+    def select(self, index):
+        if index < 0 or index >= self.size:
+            raise Exception("Invalid index")
+        
+        itr = self.head
+        position = 0
+        for i in range(self.level - 1, -1, -1):
+            while itr.next[i] is not None and position + itr.width[i] <= index + 1:
+                position += itr.width[i]
+                itr = itr.next[i]
+        return itr.key, itr.value
+    
+    def scan(self, start=None, stop=None):
+        # Yields (key, value) for start <= key < stop in order, None means no bound
+        itr = self.head.next[0] if start is None else self._find(start)[0][0].next[0]
+        while itr is not None and (stop is None or itr.key < stop):
+            yield itr.key, itr.value
+            itr = itr.next[0]
+            
+sl = SkipList(seed=42)
+for key in [30, 10, 50, 20, 40]:
+    sl.insert(key, "value%d" % key)
+sl.print()
+print(sl.search(20)) # Output: value20
+sl.delete(20)
+print(sl.rank(30), sl.select(1)) # Output: 1 (30, 'value30')
+print(list(sl.scan(25, 50))) # Output: [(30, 'value30'), (40, 'value40')]
+print('Length: ', sl.get_length())
+
+# Time Complexity (expected, the levels are random):
+# - search/insert/delete/rank/select: O(log n)
+# - scan: O(log n + k) for k keys in the range
+# - Memory: 2 pointers per node on average (1 + 1/2 + 1/4 + ...), plus a width per pointer
+
+# Benchmark:
+# benchmark_append() builds a list of n values with insert_values() (append after tail, O(1) per value)
+# and with a walk from head to the last node before every append (what insert_at_end used to do, O(n) per value).
+# The time per append of the walk grows with n, the time per append with the tail pointer stays flat.
+import time
+
+def build_by_walking(data_list):
+    head = None
+    for data in data_list:
+        if head is None:
+            head = Node(data)
+            continue
+        itr = head
+        while itr.next:
+            itr = itr.next
+        itr.next = Node(data, itr, None)
+    return head
+
+def benchmark_append(sizes=(1000, 10000, 100000), max_walk_size=10000):
+    for n in sizes:
+        dll = DoublyLinkedList()
+        start = time.perf_counter()
+        dll.insert_values(range(n))
+        tail_time = time.perf_counter() - start
+        start = time.perf_counter()
+        dll.length()
+        length_time = time.perf_counter() - start
+        line = "n=%-8d tail pointer: %6.3f us/append, length(): %.3f us" % (n, tail_time / n * 1e6, length_time * 1e6)
+        if n <= max_walk_size:
+            start = time.perf_counter()
+            build_by_walking(range(n))
+            walk_time = time.perf_counter() - start
+            line += "   walk from head: %8.3f us/append (%.0fx slower)" % (walk_time / n * 1e6, walk_time / tail_time)
+        else:
+            line += "   walk from head: skipped (O(n^2))"
+        print(line)
+
+if __name__ == "__main__":
+    benchmark_append()
+
+# benchmark_node_memory() builds the same n-node doubly linked list three ways and reports the memory per node
+# (tracemalloc) and the time to build it and to walk it:
+# - DictNode: a node with a __dict__, what Node was before __slots__
+# - Node: the __slots__ node
+# - ArenaDoublyLinkedList: nodes as indices into parallel arrays
+# Every node stores the same value (None) so only the node overhead is measured.
+# (tracemalloc does not count the 16-byte garbage collector header in front of every node object.)
+import gc
+import tracemalloc
+
+class DictNode:
+    def __init__(self, data=None, prev=None, next=None):
+        self.data = data
+        self.prev = prev
+        self.next = next
+        
+def build_chain(node_class, n):
+    head = tail = node_class()
+    for _ in range(n - 1):
+        node = node_class(None, tail, None)
+        tail.next = node
+        tail = node
+    return head
+
+def walk_chain(head):
+    count = 0
+    while head:
+        count += 1
+        head = head.next
+    return count
+
+def walk_arena(ll):
+    next = ll.arena.next
+    count = 0
+    itr = ll.head
+    while itr != NULL:
+        count += 1
+        itr = next[itr]
+    return count
+
+def benchmark_node_memory(n=200000):
+    def build_arena():
+        ll = ArenaDoublyLinkedList(capacity=n)
+        for _ in range(n):
+            ll.insert_at_end(None)
+        return ll
+    
+    builds = {
+        "dict node": (lambda: build_chain(DictNode, n), walk_chain),
+        "slots node": (lambda: build_chain(Node, n), walk_chain),
+        "arena": (build_arena, walk_arena),
+    }
+    for name, (build, walk) in builds.items():
+        tracemalloc.start()
+        chain = build()
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        # The prev/next links are reference cycles: only the garbage collector frees a dropped chain
+        del chain
+        gc.collect()
+        start = time.perf_counter()
+        chain = build()
+        build_time = time.perf_counter() - start
+        start = time.perf_counter()
+        walk(chain)
+        walk_time = time.perf_counter() - start
+        # A full collection visits every object the garbage collector tracks: every node, but not the arena's links
+        start = time.perf_counter()
+        gc.collect()
+        gc_time = time.perf_counter() - start
+        print("%-10s %6.1f bytes/node   build: %5.3f us/node   walk: %5.3f us/node   gc.collect(): %6.2f ms"
+              % (name, memory / n, build_time / n * 1e6, walk_time / n * 1e6, gc_time * 1e3))
+        del chain
+        gc.collect()
+        
+if __name__ == "__main__":
+    benchmark_node_memory()
+
+# benchmark_unrolled() compares LinkedList and UnrolledLinkedList holding the same n values:
+# memory per value, a full traversal, and insert_at at random indices (walk to the index, then insert).
+
+def walk_unrolled(ll):
+    count = 0
+    itr = ll.head
+    while itr:
+        for data in itr.items:
+            count += 1
+        itr = itr.next
+    return count
+
+def benchmark_unrolled(n=1000000, inserts=200, capacity=None, seed=42):
+    # capacity around sqrt(n) balances the walk between nodes and the shift inside a node
+    capacity = capacity or max(2, int(n ** 0.5))
+    values = list(range(n))
+    lists = {
+        "linked list": (LinkedList, walk_chain),
+        "unrolled (c=%d)" % capacity: (lambda: UnrolledLinkedList(capacity), walk_unrolled),
+    }
+    for name, (make_list, walk) in lists.items():
+        ll = make_list()
+        tracemalloc.start()
+        ll.insert_values(values)
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        start = time.perf_counter()
+        walk(ll.head if walk is walk_chain else ll)
+        walk_time = time.perf_counter() - start
+        rng = random.Random(seed)
+        start = time.perf_counter()
+        for _ in range(inserts):
+            ll.insert_at(rng.randrange(ll.get_length()), None)
+        insert_time = time.perf_counter() - start
+        print("%-16s %5.1f bytes/value   walk: %5.3f us/value   insert_at: %8.2f us"
+              % (name, memory / n, walk_time / n * 1e6, insert_time / inserts * 1e6))
+        del ll
+        gc.collect()
+        
+if __name__ == "__main__":
+    benchmark_unrolled(200000)
+
+# benchmark_splice() moves a list of n values to the end of another one with extend() (relinks the boundary nodes)
+# and with insert_at_end() in a loop (one new node per value): the first stays flat, the second grows with n.
+def benchmark_splice(sizes=(1000, 10000, 100000, 1000000)):
+    for n in sizes:
+        donor = DoublyLinkedList()
+        donor.insert_values(range(n))
+        target = DoublyLinkedList()
+        start = time.perf_counter()
+        for data in donor:
+            target.insert_at_end(data)
+        copy_time = time.perf_counter() - start
+        start = time.perf_counter()
+        target.extend(donor)
+        splice_time = time.perf_counter() - start
+        print("n=%-8d extend(): %5.2f us   insert_at_end loop: %10.1f us" % (n, splice_time * 1e6, copy_time * 1e6))
+        
+if __name__ == "__main__":
+    benchmark_splice()
+
+# benchmark_cursor() makes k inserts around the middle of a list of n values (an editor typing in the middle of a file):
+# insert_at() walks n / 2 nodes for every insert, the cursor walks only the distance to the next edit.
+def benchmark_cursor(n=100000, edits=2000, seed=42):
+    rng = random.Random(seed)
+    offsets = [rng.randint(-3, 3) for _ in range(edits)]
+    for name in ("insert_at", "cursor"):
+        dll = DoublyLinkedList()
+        dll.insert_values(range(n))
+        index = n // 2
+        cursor = dll.cursor(index)
+        start = time.perf_counter()
+        for offset in offsets:
+            index = min(max(index + offset, 0), dll.length())
+            if name == "insert_at":
+                dll.insert_at(index, None)
+            else:
+                cursor.move_to(index)
+                cursor.insert_before(None)
+            index += 1
+        elapsed = time.perf_counter() - start
+        print("%-9s %8.2f us/edit" % (name, elapsed / edits * 1e6))
+        
+if __name__ == "__main__":
+    benchmark_cursor()
+
+# benchmark_sort() sorts n random values in place with sort() and by copying them to a Python list,
+# sorting it with sorted() and rebuilding the list with insert_values(). sorted() runs in C and wins on time,
+# sort() needs no extra memory: no list of n values and no second set of n nodes (peak memory from tracemalloc).
+def benchmark_sort(n=1000000, seed=42):
+    rng = random.Random(seed)
+    values = [rng.random() for _ in range(n)]
+    for list_class in (LinkedList, DoublyLinkedList):
+        for name in ("sort()", "list + rebuild"):
+            ll = list_class()
+            ll.insert_values(values)
+            gc.collect()
+            tracemalloc.start()
+            start = time.perf_counter()
+            if name == "sort()":
+                ll.sort()
+            else:
+                ll.insert_values(sorted(ll))
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            if list(ll) != sorted(values):
+                raise AssertionError("%s did not sort the list" % name)
+            print("%-16s %-14s %7.3f seconds   peak extra memory: %6.1f MB" % (list_class.__name__, name, elapsed, peak / 1e6))
+            del ll
+            
+if __name__ == "__main__":
+    benchmark_sort(100000)
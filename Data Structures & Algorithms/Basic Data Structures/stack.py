@@ -44,6 +44,9 @@ class Stack:
     def __str__(self):
         return str(self.stack)
     
+# Every class in this file is called Stack, keep a name for the list-based one so it can be compared later
+ListStack = Stack
+
 # Example usage
 if __name__ == "__main__":
     stack = Stack()
@@ -59,7 +62,10 @@ if __name__ == "__main__":
     print("Is empty:", stack.is_empty())  # Output: False
     print("Pop:", stack.pop())  # Output: 1
     print("Is empty:", stack.is_empty())  # Output: True
-    stack.pop()  # Exception: Stack is empty
+    try:
+        stack.pop()
+    except Exception as error:
+        print(error)  # Output: Stack is empty
     
 # Time Complexity:
 # - Push: O(1)
@@ -69,7 +75,10 @@ if __name__ == "__main__":
 # - Size: O(1)
 
 # Stack using Linked List:
+# __slots__ stores data and next as fixed fields instead of a per-node __dict__: about 3x less memory per push
 class Node:
+    __slots__ = ("data", "next")
+    
     def __init__(self, data):
         self.data = data
         self.next = None
@@ -77,20 +86,20 @@ class Node:
 class Stack:
     def __init__(self):
         self.top = None
-        self.size = 0
+        self.count = 0
     
     def push(self, data):
         new_node = Node(data)
         new_node.next = self.top
         self.top = new_node
-        self.size += 1
+        self.count += 1
     
     def pop(self):
         if self.is_empty():
             raise Exception("Stack is empty")
         data = self.top.data
         self.top = self.top.next
-        self.size -= 1
+        self.count -= 1
         return data
     
     def peek(self):
@@ -99,10 +108,10 @@ class Stack:
         return self.top.data
     
     def is_empty(self):
-        return self.size == 0
+        return self.count == 0
     
     def size(self):
-        return self.size
+        return self.count
     
     def __str__(self):
         current = self.top
@@ -112,6 +121,8 @@ class Stack:
             current = current.next
         return str(stack)
     
+LinkedStack = Stack
+
 # Example usage
 if __name__ == "__main__":
     stack = Stack()
@@ -127,7 +138,10 @@ if __name__ == "__main__":
     print("Is empty:", stack.is_empty())  # Output: False
     print("Pop:", stack.pop())  # Output: 1
     print("Is empty:", stack.is_empty())  # Output: True
-    stack.pop()  # Exception: Stack is empty
+    try:
+        stack.pop()
+    except Exception as error:
+        print(error)  # Output: Stack is empty
     
 # Time Complexity:
 # - Push: O(1)
@@ -162,4 +176,323 @@ class Stack:
         return len(self.stack)
     
     def __str__(self):
-        return str(self.stack)
\ No newline at end of file
+        return str(self.stack)
+
+# Typed Stack using array:
+# A list (or a deque) stores a pointer to a Python object for every element: pushing a float allocates a 24-byte
+# float object plus the 8-byte pointer, and a linked stack adds a Node on top of that.
+# The array module stores the raw values instead (typecode "d": 8-byte C doubles, "i": 4-byte C ints, ...),
+# like an array in C: no object per element and no garbage collector work.
+# - The buffer is preallocated with an explicit capacity, push/pop only move the top index
+# - When it is full it grows geometrically (capacity * growth): the copies add up to O(n), so push is amortized O(1)
+#   (this is the reallocation the list-based Stack does too, but here it is visible and tunable with reserve())
+# - push_many/pop_many copy a whole slice in one call instead of one Python-level call per element
+# - With numpy_buffer=True the buffer is a NumPy array (NumPy must be installed, it is never picked automatically,
+#   so the return types do not depend on the environment): push_many/pop_many then take and return NumPy arrays
+#   without converting the values one by one
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+    
+class ArrayStack:
+    def __init__(self, typecode="d", capacity=16, growth=2, numpy_buffer=False):
+        if growth <= 1:
+            raise ValueError("growth must be greater than 1")
+        if numpy_buffer and numpy is None:
+            raise ImportError("numpy_buffer=True needs NumPy")
+        self.typecode = typecode
+        self.growth = growth
+        self.numpy_buffer = numpy_buffer
+        self.buffer = self._allocate(max(capacity, 1))
+        self.count = 0
+        
+    def _allocate(self, capacity):
+        if self.numpy_buffer:
+            return numpy.empty(capacity, dtype=self.typecode)
+        return array(self.typecode, [0]) * capacity
+    
+    def capacity(self):
+        return len(self.buffer)
+    
+    def reserve(self, capacity):
+        # Makes room for capacity elements: a single copy instead of several growth steps
+        if capacity <= len(self.buffer):
+            return
+        if self.numpy_buffer:
+            buffer = self._allocate(capacity)
+            buffer[:self.count] = self.buffer[:self.count]
+            self.buffer = buffer
+        else:
+            self.buffer.extend(array(self.typecode, [0]) * (capacity - len(self.buffer)))
+            
+    def _grow(self, needed):
+        self.reserve(max(needed, int(len(self.buffer) * self.growth)))
+        
+    def push(self, data):
+        if self.count == len(self.buffer):
+            self._grow(self.count + 1)
+        self.buffer[self.count] = data
+        self.count += 1
+        
+    def pop(self):
+        if self.count == 0:
+            raise Exception("Stack is empty")
+        self.count -= 1
+        if self.numpy_buffer:
+            return self.buffer.item(self.count)
+        return self.buffer[self.count]
+    
+    def peek(self):
+        if self.count == 0:
+            raise Exception("Stack is empty")
+        if self.numpy_buffer:
+            return self.buffer.item(self.count - 1)
+        return self.buffer[self.count - 1]
+    
+    def push_many(self, values):
+        # values: an array of the same typecode, a NumPy array, a list, or any iterable of numbers
+        if self.numpy_buffer:
+            if isinstance(values, (numpy.ndarray, array, list, tuple)):
+                values = numpy.asarray(values, dtype=self.typecode)
+            else:
+                # numpy.asarray() would make a 0-d object array out of a generator
+                values = numpy.fromiter(values, dtype=self.typecode)
+        elif not (isinstance(values, array) and values.typecode == self.typecode):
+            values = array(self.typecode, values)
+        end = self.count + len(values)
+        if end > len(self.buffer):
+            self._grow(end)
+        self.buffer[self.count:end] = values
+        self.count = end
+        
+    def pop_many(self, n):
+        # Returns the top n values in the order pop() would return them (top first), as an array
+        if n < 0:
+            raise ValueError("n must not be negative")
+        if n > self.count:
+            raise Exception("Stack has fewer than %d elements" % n)
+        start = self.count - n
+        values = self.buffer[start:self.count][::-1]
+        self.count = start
+        return values.copy() if self.numpy_buffer else values
+    
+    def is_empty(self):
+        return self.count == 0
+    
+    def size(self):
+        return self.count
+    
+    def __len__(self):
+        return self.count
+    
+    def __str__(self):
+        return str(self.buffer[:self.count].tolist())
+    
+# Example usage
+if __name__ == "__main__":
+    stack = ArrayStack("d", capacity=2)
+    stack.push(1.5)
+    stack.push(2.5)
+    stack.push(3.5)
+    print(stack, stack.capacity())  # Output: [1.5, 2.5, 3.5] 4
+    stack.push_many([4.5, 5.5])
+    print(stack.pop_many(3))  # Output: array('d', [5.5, 4.5, 3.5])
+    print("Pop:", stack.pop())  # Output: 2.5
+    print("Size:", stack.size())  # Output: 1
+    stack.push_many(i / 2 for i in range(3))
+    print(stack)  # Output: [1.5, 0.0, 0.5, 1.0]
+    if numpy is not None:
+        stack = ArrayStack("d", numpy_buffer=True)
+        stack.push_many(i / 2 for i in range(3))
+        stack.push_many(numpy.arange(2.0))
+        print(stack.pop_many(5))  # Output: [1.  0.  1.  0.5 0. ]
+    
+# Time Complexity:
+# - Push: O(1) amortized (O(n) when the buffer grows)
+# - Pop/Peek: O(1)
+# - push_many/pop_many: O(k) for k values, in a single slice copy
+# - Memory: itemsize bytes per element (8 for "d") instead of a pointer and a Python object
+#
+# benchmark_stacks() pushes and pops n floats one by one on every stack, and in chunks with push_many/pop_many,
+# and reports the throughput and the memory per element (tracemalloc, with all n values on the stack).
+import time
+import tracemalloc
+
+def benchmark_stacks(n=1000000, chunk=1000):
+    values = [float(i) for i in range(n)]
+    stacks = {
+        "list": ListStack,
+        "linked": LinkedStack,
+        "deque": Stack,
+        "array": lambda: ArrayStack("d"),
+    }
+    if numpy is not None:
+        stacks["numpy"] = lambda: ArrayStack("d", numpy_buffer=True)
+    for name, make_stack in stacks.items():
+        stack = make_stack()
+        tracemalloc.start()
+        start = time.perf_counter()
+        for value in values:
+            stack.push(value * 1.5)
+        push_time = time.perf_counter() - start
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        start = time.perf_counter()
+        for _ in range(n):
+            stack.pop()
+        pop_time = time.perf_counter() - start
+        line = "%-7s %5.1f bytes/element   push: %5.3f us   pop: %5.3f us" % (name, memory / n, push_time / n * 1e6, pop_time / n * 1e6)
+        if isinstance(stack, ArrayStack):
+            start = time.perf_counter()
+            for i in range(0, n, chunk):
+                stack.push_many(values[i:i + chunk])
+            while not stack.is_empty():
+                stack.pop_many(min(chunk, stack.size()))
+            line += "   push_many + pop_many: %5.3f us/element" % ((time.perf_counter() - start) / n * 1e6)
+        print(line)
+        
+if __name__ == "__main__":
+    benchmark_stacks(200000)
+
+# Thread-safe Stack:
+# None of the stacks above can be shared between threads: two threads can both see one element left and both pop it,
+# and a consumer that finds the stack empty can only raise or poll is_empty() in a loop (busy waiting).
+# ConcurrentStack puts one lock around the list and two condition variables on that lock:
+# - pop() waits on not_empty until a push() notifies it, push() on a full stack waits on not_full until a pop()
+# - a waiting thread sleeps inside Condition.wait(): it releases the lock and uses no CPU until it is notified
+# - wait_for() checks the condition again after every wake-up (another thread may have taken the element first)
+# - timeout=None waits forever, timeout=t raises after t seconds, block=False (or try_pop) never waits
+# - drain(n) pops up to n elements under a single lock acquisition, for workers that take a batch at a time
+# max_size=None means unbounded: push() never waits.
+import threading
+
+class ConcurrentStack:
+    def __init__(self, max_size=None):
+        if max_size is not None and max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.stack = []
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.not_empty = threading.Condition(self.lock)
+        self.not_full = threading.Condition(self.lock)
+        
+    def _has_room(self):
+        return self.max_size is None or len(self.stack) < self.max_size
+    
+    def push(self, data, block=True, timeout=None):
+        with self.not_full:
+            if not self.not_full.wait_for(self._has_room, timeout if block else 0):
+                raise Exception("Stack is full")
+            self.stack.append(data)
+            self.not_empty.notify()
+            
+    def pop(self, block=True, timeout=None):
+        with self.not_empty:
+            if not self.not_empty.wait_for(lambda: self.stack, timeout if block else 0):
+                raise Exception("Stack is empty")
+            data = self.stack.pop()
+            self.not_full.notify()
+            return data
+        
+    def try_pop(self, default=None):
+        with self.lock:
+            if not self.stack:
+                return default
+            data = self.stack.pop()
+            self.not_full.notify()
+            return data
+        
+    def drain(self, n=None):
+        # Pops up to n elements (all of them when n is None) without waiting, top first
+        with self.lock:
+            count = len(self.stack) if n is None else min(n, len(self.stack))
+            if count == 0:
+                return []
+            values = self.stack[-count:]
+            del self.stack[-count:]
+            values.reverse()
+            self.not_full.notify(count)
+            return values
+        
+    def peek(self):
+        with self.lock:
+            if not self.stack:
+                raise Exception("Stack is empty")
+            return self.stack[-1]
+        
+    def is_empty(self):
+        with self.lock:
+            return len(self.stack) == 0
+        
+    def size(self):
+        with self.lock:
+            return len(self.stack)
+        
+    def __len__(self):
+        return self.size()
+    
+    def __str__(self):
+        with self.lock:
+            return str(self.stack)
+        
+# Test harness: producers push distinct items into a small bounded stack while consumers pop them (blocking),
+# then checks that every item was popped exactly once. A "stop" item pushed at the end would be popped first (LIFO),
+# so consumers stop when a pop times out after the producers are done and the stack is empty.
+def stress_test_concurrent_stack(producers=4, consumers=4, items_per_producer=10000, max_size=16):
+    stack = ConcurrentStack(max_size)
+    popped = [[] for _ in range(consumers)]
+    producers_done = threading.Event()
+    
+    def producer(p):
+        for i in range(items_per_producer):
+            stack.push((p, i))
+            
+    def consumer(c):
+        while True:
+            try:
+                data = stack.pop(timeout=0.01)
+            except Exception:
+                if producers_done.is_set() and stack.is_empty():
+                    return
+                continue
+            popped[c].append(data)
+            
+    consumer_threads = [threading.Thread(target=consumer, args=(c,)) for c in range(consumers)]
+    producer_threads = [threading.Thread(target=producer, args=(p,)) for p in range(producers)]
+    start = time.perf_counter()
+    for thread in consumer_threads + producer_threads:
+        thread.start()
+    for thread in producer_threads:
+        thread.join()
+    producers_done.set()
+    for thread in consumer_threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    items = [data for values in popped for data in values]
+    expected = producers * items_per_producer
+    if len(items) != expected or len(set(items)) != expected:
+        raise AssertionError("lost or duplicated items: %d popped, %d unique, %d pushed" % (len(items), len(set(items)), expected))
+    print("%d items through %d producers and %d consumers in %.3f seconds (%.0f items/sec), none lost or duplicated"
+          % (expected, producers, consumers, elapsed, expected / elapsed))
+    
+# Example usage
+if __name__ == "__main__":
+    stack = ConcurrentStack(max_size=2)
+    stack.push(1)
+    stack.push(2)
+    try:
+        stack.push(3, timeout=0.1)
+    except Exception as error:
+        print(error)  # Output: Stack is full
+    print(stack.drain())  # Output: [2, 1]
+    print(stack.try_pop())  # Output: None
+    threading.Timer(0.1, stack.push, args=(42,)).start()
+    print("Pop:", stack.pop(timeout=1))  # Output: 42 (after waiting for the timer thread)
+    stress_test_concurrent_stack()
+    
+# Time Complexity:
+# - push/pop/try_pop/peek: O(1) plus the time spent waiting
+# - drain(n): O(n)